@@ -0,0 +1,56 @@
+# backend/chunking.py
+# Token-window chunking that tokenizes a page exactly once.
+# Each chunk carries both its character span in the source text (for embedding and
+# storage) and ready-to-use classifier input_ids, so nothing goes through
+# decode -> re-encode.
+
+
+def chunk_text_with_offsets(text, tokenizer, max_tokens=256, overlap=40, max_length=None):
+    """
+    Splits `text` into windows of `max_tokens` tokens overlapping by `overlap`.
+
+    Returns a list of dicts:
+        text        -- text[char_start:char_end], the original (un-normalised) characters
+        char_start  -- offset of the window's first character in `text`
+        char_end    -- offset just past the window's last character
+        input_ids   -- window ids wrapped in the model's special tokens, truncated so the
+                       whole sequence fits `max_length` (when given)
+
+    Needs a fast (Rust) tokenizer for offset mappings; slow tokenizers fall back to
+    decoding each window, without character offsets.
+    """
+    if not text:
+        return []
+
+    if getattr(tokenizer, "is_fast", False):
+        encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        token_ids, offsets = encoding["input_ids"], encoding["offset_mapping"]
+    else:
+        token_ids, offsets = tokenizer.encode(text, add_special_tokens=False), None
+
+    content_limit = None
+    if max_length is not None:
+        content_limit = max_length - tokenizer.num_special_tokens_to_add(pair=False)
+
+    chunks = []
+    start = 0
+    while start < len(token_ids):
+        end = min(start + max_tokens, len(token_ids))
+        window_ids = token_ids[start:end]
+        model_ids = window_ids[:content_limit] if content_limit is not None else window_ids
+
+        if offsets is not None:
+            char_start, char_end = offsets[start][0], offsets[end - 1][1]
+            chunk_text = text[char_start:char_end]
+        else:
+            char_start = char_end = None
+            chunk_text = tokenizer.decode(window_ids, skip_special_tokens=True, clean_up_tokenization_spaces=True)
+
+        chunks.append({
+            "text": chunk_text,
+            "char_start": char_start,
+            "char_end": char_end,
+            "input_ids": tokenizer.build_inputs_with_special_tokens(model_ids),
+        })
+        start += max_tokens - overlap
+    return chunks
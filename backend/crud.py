@@ -1,7 +1,9 @@
 # backend/crud.py
 from sqlalchemy.orm import Session
+from sqlalchemy import or_, and_
 import models, schemas, auth
 import uuid
+import datetime
 
 # --- User Functions (Unchanged) ---
 def get_user(db: Session, user_id: str):
@@ -60,14 +62,58 @@ def get_documents_by_department(db: Session, department: str, skip: int = 0, lim
     # This is now a case-INSENSITIVE comparison. It will match 'HR', 'hr', 'Hr', etc.
     return db.query(models.Document).filter(models.Document.department.ilike(department)).offset(skip).limit(limit).all()
 
-def create_document(db: Session, document: schemas.DocumentCreate, file_path: str, user_id: str):
+def get_document_by_file_path(db: Session, file_path: str):
+    return db.query(models.Document).filter(models.Document.file_path == file_path).first()
+
+def get_processed_document_by_hash(db: Session, content_hash: str):
+    """The earliest fully processed document with these exact bytes, if any."""
+    return (
+        db.query(models.Document)
+        .filter(models.Document.content_hash == content_hash, models.Document.status == "completed")
+        .order_by(models.Document.upload_date)
+        .first()
+    )
+
+def create_document(db: Session, document: schemas.DocumentCreate, file_path: str, user_id: str,
+                    content_hash: str = None):
     db_document = models.Document(
         id=uuid.uuid4(),
         title=document.title,
         department=document.department,
         file_path=file_path,
         uploader_id=user_id,
-        status="processing"
+        status="processing",
+        content_hash=content_hash
+    )
+    db.add(db_document)
+    db.commit()
+    db.refresh(db_document)
+    return db_document
+
+def create_duplicate_document(db: Session, original: models.Document, document: schemas.DocumentCreate,
+                              file_path: str, user_id: str, document_id: uuid.UUID = None):
+    """
+    Creates the record for a re-upload of `original`, reusing its ML results
+    (summary, entities, vectors and highlighted PDF) instead of processing it again.
+    `document_id` lets the caller put the id in the stored file name beforehand.
+    """
+    department = document.department
+    if not department or department == "auto-detected":
+        department = original.department
+    db_document = models.Document(
+        id=document_id or uuid.uuid4(),
+        title=document.title,
+        department=department,
+        file_path=file_path,
+        uploader_id=user_id,
+        status="completed",
+        summary=original.summary,
+        deadlines=original.deadlines,
+        financial_terms=original.financial_terms,
+        highlighted_file_path=original.highlighted_file_path,
+        highlight_overlay=original.highlight_overlay,
+        content_hash=original.content_hash,
+        vector_namespace=original.vector_namespace
     )
     db.add(db_document)
     db.commit()
@@ -102,7 +148,8 @@ def update_question_with_answer(db: Session, question_id: uuid.UUID, answer_text
         db.refresh(db_question)
     return db_question
 
-def update_document_with_ml_results(db: Session, document_id: uuid.UUID, ml_results: dict, highlighted_file_path: str = None):
+def update_document_with_ml_results(db: Session, document_id: uuid.UUID, ml_results: dict, highlighted_file_path: str = None,
+                                    vector_namespace: str = None):
     """
     Updates a document with the results from the ML pipeline.
     """
@@ -112,11 +159,14 @@ def update_document_with_ml_results(db: Session, document_id: uuid.UUID, ml_resu
         db_document.summary = ml_results.get("summary")
         db_document.deadlines = ml_results.get("deadlines", [])
         db_document.financial_terms = ml_results.get("financials", [])
+        db_document.highlight_overlay = ml_results.get("highlight_overlay")
 
         # --- ADD THIS LINE ---
         # This checks if a URL was provided and assigns it to the database object.
         if highlighted_file_path:
             db_document.highlighted_file_path = highlighted_file_path
+        if vector_namespace:
+            db_document.vector_namespace = vector_namespace
 
         db_document.status = "completed"
         db.commit()
@@ -141,4 +191,168 @@ def get_notifications_for_department(db: Session, department: str):
     return db.query(models.Notification).filter(
         models.Notification.department.ilike(department), # <--- THE FIX
         models.Notification.is_read == False
-    ).order_by(models.Notification.created_at.desc()).all()
\ No newline at end of file
+    ).order_by(models.Notification.created_at.desc()).all()
+
+
+# --- Ingestion Job Functions ---
+def create_ingestion_job(db: Session, document_id: uuid.UUID, filename: str, payload: bytes):
+    """Queues a document for processing by the ingestion workers."""
+    db_job = models.IngestionJob(
+        document_id=document_id,
+        filename=filename,
+        payload=payload,
+        status="queued",
+        progress={}
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_ingestion_job(db: Session, job_id: uuid.UUID):
+    return db.query(models.IngestionJob).filter(models.IngestionJob.id == job_id).first()
+
+def fail_exhausted_ingestion_jobs(db: Session, stale_before: datetime.datetime, max_attempts: int):
+    """
+    Marks stale 'running' jobs that already used all their attempts (and their documents)
+    as failed. These are PDFs whose processing killed the worker, e.g. OOM or a native
+    crash, so they never reached the retry logic in ingestion.run_job.
+    """
+    exhausted = (
+        db.query(models.IngestionJob)
+        .filter(
+            models.IngestionJob.status == "running",
+            models.IngestionJob.updated_at < stale_before,
+            models.IngestionJob.attempts >= max_attempts,
+        )
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    now = datetime.datetime.utcnow()
+    for db_job in exhausted:
+        print(f"[ERROR] Job {db_job.id}: worker died on all {db_job.attempts} attempt(s); marking failed")
+        db_job.status = "failed"
+        db_job.error = db_job.error or f"Worker stopped responding on all {db_job.attempts} attempt(s)"
+        db_job.updated_at = now
+        db_job.finished_at = now
+        db_job.payload = None
+        db_document = get_document_by_id(db, db_job.document_id)
+        if db_document:
+            db_document.status = "failed"
+    db.commit()
+    return len(exhausted)
+
+def claim_next_ingestion_job(db: Session, worker_id: str, stale_after_seconds: int = 900, max_attempts: int = 3):
+    """
+    Atomically claims the oldest queued job with SELECT ... FOR UPDATE SKIP LOCKED, so
+    any number of workers can poll the same table. Jobs left 'running' by a worker that
+    died (no update for `stale_after_seconds`) are claimed again while they have
+    attempts left, and failed once they have none.
+    """
+    stale_before = datetime.datetime.utcnow() - datetime.timedelta(seconds=stale_after_seconds)
+    fail_exhausted_ingestion_jobs(db, stale_before, max_attempts)
+    db_job = (
+        db.query(models.IngestionJob)
+        .filter(or_(
+            models.IngestionJob.status == "queued",
+            and_(models.IngestionJob.status == "running", models.IngestionJob.updated_at < stale_before,
+                 models.IngestionJob.attempts < max_attempts),
+        ))
+        .order_by(models.IngestionJob.created_at.asc())
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if db_job is None:
+        db.rollback()
+        return None
+    now = datetime.datetime.utcnow()
+    db_job.status = "running"
+    db_job.worker_id = worker_id
+    db_job.attempts = (db_job.attempts or 0) + 1
+    db_job.started_at = now
+    db_job.updated_at = now
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def update_ingestion_job_stage(db: Session, job_id: uuid.UUID, stage: str, status: str, seconds: float = None,
+                               extra: dict = None):
+    """Records the progress of one pipeline stage (plus any `extra` fields for that stage)."""
+    db_job = get_ingestion_job(db, job_id)
+    if db_job:
+        progress = dict(db_job.progress or {})
+        entry = {"status": status}
+        if seconds is not None:
+            entry["seconds"] = round(seconds, 3)
+        if extra:
+            entry.update(extra)
+        progress[stage] = entry
+        db_job.progress = progress
+        db_job.stage = stage
+        db_job.updated_at = datetime.datetime.utcnow()
+        db.commit()
+    return db_job
+
+def heartbeat_ingestion_job(db: Session, job_id: uuid.UUID, worker_id: str):
+    """
+    Refreshes updated_at of a running job owned by `worker_id`, so it is not taken for
+    stale. Returns False if another worker has taken the job over.
+    """
+    updated = (
+        db.query(models.IngestionJob)
+        .filter(
+            models.IngestionJob.id == job_id,
+            models.IngestionJob.worker_id == worker_id,
+            models.IngestionJob.status == "running",
+        )
+        .update({models.IngestionJob.updated_at: datetime.datetime.utcnow()}, synchronize_session=False)
+    )
+    db.commit()
+    return updated == 1
+
+def lock_owned_ingestion_job(db: Session, job_id: uuid.UUID, worker_id: str):
+    """
+    Row-locks the job if `worker_id` still owns it (None otherwise). The lock lasts until
+    the next commit, so results written in that transaction cannot race a takeover.
+    """
+    return (
+        db.query(models.IngestionJob)
+        .filter(
+            models.IngestionJob.id == job_id,
+            models.IngestionJob.worker_id == worker_id,
+            models.IngestionJob.status == "running",
+        )
+        .with_for_update()
+        .first()
+    )
+
+def finish_ingestion_job(db: Session, job_id: uuid.UUID, error: str = None, retry: bool = False,
+                         worker_id: str = None):
+    """
+    Marks a job completed, failed, or (retry=True) queued again after an error. With
+    `worker_id`, only while that worker still owns the job; returns None otherwise.
+    """
+    db_job = get_ingestion_job(db, job_id)
+    if db_job and worker_id is not None and (db_job.worker_id != worker_id or db_job.status != "running"):
+        print(f"[WARNING] Job {job_id} was taken over by {db_job.worker_id}; not finishing it")
+        return None
+    if db_job:
+        now = datetime.datetime.utcnow()
+        db_job.updated_at = now
+        db_job.error = error
+        if error and retry:
+            db_job.status = "queued"
+        else:
+            db_job.status = "failed" if error else "completed"
+            db_job.finished_at = now
+            db_job.payload = None
+        db.commit()
+        db.refresh(db_job)
+    return db_job
+
+def set_document_status(db: Session, document_id: uuid.UUID, status: str):
+    db_document = get_document_by_id(db, document_id)
+    if db_document:
+        db_document.status = status
+        db.commit()
+    return db_document
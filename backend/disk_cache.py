@@ -0,0 +1,161 @@
+# backend/disk_cache.py
+# Small size-bounded LRU cache on disk (SQLite), safe to share between processes.
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+
+# Reads do not write: hits update last_access and the counters in batches, flushed after
+# this many lookups or this many seconds (and before evicting), in one transaction.
+ACCESS_FLUSH_EVERY = int(os.getenv("DISK_CACHE_ACCESS_FLUSH_EVERY", "64"))
+ACCESS_FLUSH_SECONDS = float(os.getenv("DISK_CACHE_ACCESS_FLUSH_SECONDS", "5"))
+
+
+class DiskLRUCache:
+    """
+    Key/value store of bytes on disk with least-recently-used eviction.
+    The total stored size is kept under `max_bytes` (tracked as a running total, not
+    summed per insert); hit/miss counters are kept in the database so they add up
+    across every process using the same file.
+    """
+
+    def __init__(self, path, max_bytes, name="cache"):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.name = name
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._reset_pending()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        atexit.register(self.flush)
+
+    def _reset_pending(self):
+        self._pending_access = {}  # key -> last access time not yet written
+        self._pending_hits = 0
+        self._pending_misses = 0
+        self._pending_since = time.monotonic()
+
+    def _connection(self):
+        # SQLite connections must not cross a fork; reopen in every new process.
+        if self._conn is None or self._pid != os.getpid():
+            if self._pid is not None:
+                self._reset_pending()  # the parent flushes its own pending accesses
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0), ('evictions', 0)")
+            # Running byte total; initialised once from the entries of an older cache file.
+            conn.execute("INSERT OR IGNORE INTO counters SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries")
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _bump(self, conn, counter, amount=1):
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, counter))
+
+    def get(self, key):
+        """Returns the cached bytes for `key`, or None."""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._pending_misses += 1
+            else:
+                self._pending_hits += 1
+                self._pending_access[key] = time.time()
+            if (self._pending_hits + self._pending_misses >= ACCESS_FLUSH_EVERY
+                    or time.monotonic() - self._pending_since >= ACCESS_FLUSH_SECONDS):
+                self._flush(conn)
+            return None if row is None else bytes(row[0])
+
+    def flush(self):
+        """Writes pending last_access times and hit/miss counts."""
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._flush(self._conn)
+
+    def _flush(self, conn):
+        if not (self._pending_access or self._pending_hits or self._pending_misses):
+            self._pending_since = time.monotonic()
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("UPDATE entries SET last_access = MAX(last_access, ?) WHERE key = ?",
+                             [(t, key) for key, t in self._pending_access.items()])
+            self._bump(conn, "hits", self._pending_hits)
+            self._bump(conn, "misses", self._pending_misses)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._reset_pending()
+
+    def set(self, key, value):
+        """Stores `value` (bytes) under `key` and evicts old entries if over budget."""
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._connection()
+            self._flush(conn)  # eviction should see this process's recent hits
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, sqlite3.Binary(value), len(value), time.time()),
+                )
+                self._bump(conn, "bytes", len(value) - (row[0] if row else 0))
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% of the budget so we do not evict on every insert.
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        freed = 0
+        while total - freed > target:
+            # Oldest entries in small batches (index scan), not the whole table.
+            oldest = conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC LIMIT 64").fetchall()
+            if not oldest:
+                break
+            for key, size in oldest:
+                if total - freed <= target:
+                    break
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                freed += size
+                evicted += 1
+        self._bump(conn, "bytes", -freed)
+        self._bump(conn, "evictions", evicted)
+
+    def stats(self):
+        with self._lock:
+            conn = self._connection()
+            self._flush(conn)
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "name": self.name,
+            "entries": entries,
+            "bytes": counters["bytes"],
+            "max_bytes": self.max_bytes,
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "evictions": counters["evictions"],
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
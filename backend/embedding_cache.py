@@ -0,0 +1,127 @@
+# backend/embedding_cache.py
+# Persistent cache of chunk embeddings. GeM bid documents repeat whole pages of
+# boilerplate (terms, MSE clauses, EMD text), so most of their chunks were embedded
+# before by an earlier upload.
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from disk_cache import DiskLRUCache
+
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join("cache", "embedding_cache.sqlite3"))
+EMBED_CACHE_MAX_MB = int(os.getenv("EMBED_CACHE_MAX_MB", "512"))
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = DiskLRUCache(EMBED_CACHE_PATH, EMBED_CACHE_MAX_MB * 1024 * 1024, name="embedding")
+    return _cache
+
+
+def normalize_text(text):
+    """NFKC + collapsed whitespace; the text that is actually embedded on a miss."""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def embedding_key(model_id, kind, normalized_text):
+    digest = hashlib.sha256(f"{model_id}|{kind}|".encode("utf-8"))
+    digest.update(normalized_text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def embed_with_cache(texts, embed_fn, model_id, kind="document"):
+    """
+    Returns one embedding (list of floats) per text, in order.
+    Only texts missing from the cache are passed to `embed_fn` (a list -> list of
+    vectors callable), each distinct text once. Vectors are stored as float32 blobs.
+    """
+    normalized = [normalize_text(t) for t in texts]
+    keys = [embedding_key(model_id, kind, t) for t in normalized]
+
+    found = {}
+    for key in set(keys):
+        try:
+            blob = get_cache().get(key)
+        except Exception as e:
+            print(f"[WARNING] Embedding cache read failed: {e}")
+            blob = None
+        if blob is not None:
+            found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+    missing = {}
+    for key, text in zip(keys, normalized):
+        if key not in found and key not in missing:
+            missing[key] = text
+    if missing:
+        vectors = embed_fn(list(missing.values()))
+        for key, vector in zip(missing.keys(), vectors):
+            found[key] = list(vector)
+            try:
+                get_cache().set(key, np.asarray(vector, dtype=np.float32).tobytes())
+            except Exception as e:
+                print(f"[WARNING] Embedding cache write failed: {e}")
+
+    return [found[key] for key in keys]
+
+
+def embedding_cache_stats():
+    return get_cache().stats()
+
+
+class QueryEmbeddingLRU:
+    """
+    In-process LRU of query embeddings keyed by (encoder id, normalized text).
+    With `persist=True` misses go through the disk cache above, so repeated questions
+    survive restarts and are shared between workers.
+    """
+
+    def __init__(self, max_entries, persist=False):
+        self.max_entries = max_entries
+        self.persist = persist
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_embed(self, text, embed_fn, model_id):
+        key = (model_id, normalize_text(text))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        if self.persist:
+            vector = embed_with_cache([text], embed_fn, model_id, kind="query")[0]
+        else:
+            vector = list(embed_fn([key[1]])[0])
+
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return vector
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": "query_lru",
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "persist": self.persist,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
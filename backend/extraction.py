@@ -0,0 +1,335 @@
+# backend/extraction.py
+# Page text extraction (text layer + OCR of embedded images).
+# Kept free of the heavy ML imports so process-pool workers start quickly.
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import multiprocessing
+
+import pymupdf
+from PIL import Image, ImageOps, ImageFilter
+import pytesseract
+from pytesseract import Output
+
+from ocr_cache import cached_ocr, OCR_CACHE_VERSION
+
+# ==================== CONFIGURATION ====================
+# Number of extraction processes. 1 keeps the old serial behaviour.
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", os.cpu_count() or 1))
+# Total memory budget (MB) for the extraction pool; limits how many workers we start.
+EXTRACTION_MAX_MEMORY_MB = int(os.getenv("EXTRACTION_MAX_MEMORY_MB", "2048"))
+# Rough resident size of one worker (PyMuPDF + Pillow + a page being OCR'd).
+EXTRACTION_WORKER_BASE_MB = int(os.getenv("EXTRACTION_WORKER_BASE_MB", "200"))
+# Documents shorter than this are extracted in-process; pool start-up is not worth it.
+PARALLEL_MIN_PAGES = int(os.getenv("EXTRACTION_PARALLEL_MIN_PAGES", "4"))
+# Pages handed to a worker per task (each task opens the PDF once).
+PAGES_PER_TASK = int(os.getenv("EXTRACTION_PAGES_PER_TASK", "4"))
+# Worker processes are recycled after this many tasks to return memory to the OS
+# (spawn/forkserver only: CPython does not allow recycling forked workers).
+MAX_TASKS_PER_WORKER = int(os.getenv("EXTRACTION_MAX_TASKS_PER_WORKER", "50"))
+# Workers start from a small fork server that has only this module imported: no copy of
+# the caller's models, no locks inherited from its upload/heartbeat threads, and no
+# re-import of the caller's __main__ as with 'spawn'.
+EXTRACTION_START_METHOD = os.getenv("EXTRACTION_START_METHOD", "forkserver" if os.name == "posix" else "spawn")
+
+OCR_LANG = "eng+mal"
+
+# --- OCR gating ---
+# A page counts as "digital" when its text layer has at least this many characters
+# or its text blocks cover at least this fraction of the page.
+OCR_MIN_TEXT_CHARS = int(os.getenv("OCR_MIN_TEXT_CHARS", "200"))
+OCR_MIN_TEXT_COVERAGE = float(os.getenv("OCR_MIN_TEXT_COVERAGE", "0.10"))
+# On digital pages, images below this share of the page area (logos, stamps, signatures) are skipped.
+OCR_SKIP_MAX_AREA = float(os.getenv("OCR_SKIP_MAX_AREA", "0.15"))
+# On digital pages, images below this share are OCR'd at reduced resolution.
+OCR_FULL_MIN_AREA = float(os.getenv("OCR_FULL_MIN_AREA", "0.50"))
+# Images with a side shorter than this cannot hold legible text.
+OCR_MIN_IMAGE_PX = int(os.getenv("OCR_MIN_IMAGE_PX", "48"))
+# On digital pages, images drawn below this resolution (image px per inch of page) are
+# skipped: body text in them would be a few pixels tall.
+OCR_MIN_DPI = int(os.getenv("OCR_MIN_DPI", "50"))
+# Longest side (px) used when OCR'ing a down-sampled image; full OCR keeps the old 1000px cap.
+OCR_DOWNSAMPLE_MAX_SIDE = int(os.getenv("OCR_DOWNSAMPLE_MAX_SIDE", "600"))
+OCR_FULL_MAX_SIDE = 1000
+
+
+def _text_layer_stats(page, blocks):
+    """Returns (character count, fraction of the page covered by text blocks)."""
+    page_area = abs(page.rect) or 1.0
+    chars = 0
+    covered = 0.0
+    for block in blocks:
+        txt = block[4].strip()
+        if not txt:
+            continue
+        chars += len(txt)
+        covered += abs(pymupdf.Rect(block[:4]) & page.rect)
+    return chars, min(covered / page_area, 1.0)
+
+
+def plan_image_ocr(page, img, text_chars, text_coverage):
+    """
+    Decides how to treat one embedded image: "skip", "downsample" or "full" OCR.
+    Returns a dict with the action, the reason and the measurements behind it.
+    """
+    xref, width, height = img[0], img[2], img[3]
+    page_area = abs(page.rect) or 1.0
+    rects = page.get_image_rects(xref)
+    area_frac = min(sum(abs(r & page.rect) for r in rects) / page_area, 1.0)
+    dpi = round(width / (rects[0].width / 72)) if rects and rects[0].width else None
+    has_text_layer = text_chars >= OCR_MIN_TEXT_CHARS or text_coverage >= OCR_MIN_TEXT_COVERAGE
+
+    if min(width, height) < OCR_MIN_IMAGE_PX:
+        action, reason = "skip", "image too small to hold text"
+    elif has_text_layer and not rects:
+        action, reason = "skip", "image not placed on a page that has a text layer"
+    elif has_text_layer and dpi is not None and dpi < OCR_MIN_DPI:
+        action, reason = "skip", "image resolution too low to hold legible text"
+    elif has_text_layer and area_frac < OCR_SKIP_MAX_AREA:
+        action, reason = "skip", "small image on a page with a text layer (logo/stamp/signature)"
+    elif has_text_layer and area_frac < OCR_FULL_MIN_AREA:
+        action, reason = "downsample", "medium image on a page with a text layer"
+    elif has_text_layer:
+        action, reason = "full", "image covers most of the page"
+    else:
+        action, reason = "full", "page has no usable text layer"
+
+    return {
+        "xref": xref,
+        "action": action,
+        "reason": reason,
+        "area_frac": round(area_frac, 3),
+        "dpi": dpi,
+        "width": width,
+        "height": height,
+    }
+
+
+def _preprocess_for_ocr(image, action):
+    filtered = image.filter(ImageFilter.MedianFilter(size=3))
+    gray = ImageOps.grayscale(filtered)
+    if action == "downsample":
+        # Keep the aspect ratio and only ever shrink.
+        gray.thumbnail((OCR_DOWNSAMPLE_MAX_SIDE, OCR_DOWNSAMPLE_MAX_SIDE), Image.LANCZOS)
+        return gray
+    scale = 300 / 72
+    base_w = min(int(gray.width * scale), OCR_FULL_MAX_SIDE)
+    base_h = min(int(gray.height * scale), OCR_FULL_MAX_SIDE)
+    return gray.resize((base_w, base_h), Image.LANCZOS)
+
+
+def _ocr_image(image_bytes, action):
+    """
+    OCR of one image: {"text": ..., "words": [[x0, y0, x1, y1, word, line], ...]} with
+    word boxes as fractions of the image size, so they can be placed on the page later.
+    """
+    image = _preprocess_for_ocr(Image.open(io.BytesIO(image_bytes)), action)
+    data = pytesseract.image_to_data(image, lang=OCR_LANG, output_type=Output.DICT)
+    width, height = image.size
+    words, lines = [], {}
+    for i, word in enumerate(data["text"]):
+        word = word.strip()
+        if not word:
+            continue
+        line = f"{data['block_num'][i]}.{data['par_num'][i]}.{data['line_num'][i]}"
+        left, top = data["left"][i], data["top"][i]
+        words.append([left / width, top / height,
+                      (left + data["width"][i]) / width, (top + data["height"][i]) / height, word, line])
+        lines.setdefault(line, []).append(word)
+    return {"text": "\n".join(" ".join(line_words) for line_words in lines.values()), "words": words}
+
+
+def _place_ocr_words(words, rects, xref):
+    """Maps fractional OCR word boxes onto each place the image is drawn on the page."""
+    placed = []
+    for n, rect in enumerate(rects):
+        for x0, y0, x1, y1, word, line in words:
+            placed.append([
+                rect.x0 + x0 * rect.width, rect.y0 + y0 * rect.height,
+                rect.x0 + x1 * rect.width, rect.y0 + y1 * rect.height,
+                word, f"{xref}.{n}.{line}",
+            ])
+    return placed
+
+
+def extract_page(page, doc, xref_cache=None):
+    """
+    Extracts the text layer of a page plus OCR text of its images, gated per image.
+    `xref_cache` is shared by the pages of one extraction call (the serial loop or one pool
+    task), so an image repeated on those pages is looked up once. Between pool tasks the
+    image is deduplicated by the content-addressed OCR cache (ocr_cache.py) instead: only
+    tasks that reach it at the same moment both OCR it.
+    Returns {"text": ..., "ocr": [decision, ...], "ocr_words": [[x0, y0, x1, y1, word, line], ...]}
+    with the OCR'd words in page coordinates (used for highlighting scanned content).
+    """
+    if xref_cache is None:
+        xref_cache = {}
+    blocks = page.get_text("blocks")
+    raw_text = ""
+    for block in blocks:
+        txt = block[4].strip()
+        if txt:
+            raw_text += " " + txt
+
+    text_chars, text_coverage = _text_layer_stats(page, blocks)
+    decisions = []
+    ocr_words = []
+
+    images = page.get_images(full=True)
+    for img in images:
+        decision = plan_image_ocr(page, img, text_chars, text_coverage)
+        decisions.append(decision)
+        if decision["action"] == "skip":
+            continue
+
+        memo_key = (decision["xref"], decision["action"])
+        if memo_key in xref_cache:
+            ocr = xref_cache[memo_key]
+            raw_text += " " + ocr["text"]
+            ocr_words.extend(_place_ocr_words(ocr["words"], page.get_image_rects(decision["xref"]), decision["xref"]))
+            continue
+
+        try:
+            image_bytes = doc.extract_image(decision["xref"])["image"]
+        except Exception:
+            print("[WARNING] Image extraction failed")
+            decision["action"], decision["reason"] = "skip", "image could not be decoded"
+            continue
+
+        try:
+            ocr = cached_ocr(image_bytes, decision["action"], OCR_LANG,
+                             lambda: _ocr_image(image_bytes, decision["action"]))
+        except Exception:
+            continue
+        xref_cache[memo_key] = ocr
+        raw_text += " " + ocr["text"]
+        ocr_words.extend(_place_ocr_words(ocr["words"], page.get_image_rects(decision["xref"]), decision["xref"]))
+
+    return {"text": raw_text.strip(), "ocr": decisions, "ocr_words": ocr_words}
+
+
+def extract_page_text(page, doc):
+    return extract_page(page, doc)["text"]
+
+
+def open_pdf(source):
+    """Opens a PDF given either a filesystem path or the raw bytes of the file."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return pymupdf.open(stream=source, filetype="pdf")
+    return pymupdf.open(source)
+
+
+def _extract_pages_task(source, page_numbers):
+    """
+    Worker entry point: opens the PDF itself and extracts the given 1-based pages.
+    `source` is a path, or a ("shm", name, size) tuple naming the shared bytes buffer.
+    """
+    if isinstance(source, tuple):
+        _, shm_name, size = source
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            doc = open_pdf(bytes(shm.buf[:size]))
+        finally:
+            shm.close()
+    else:
+        doc = open_pdf(source)
+    # Per task; other tasks' OCR of the same image is found in the OCR cache.
+    xref_cache = {}
+    try:
+        return [(page_number, extract_page(doc[page_number - 1], doc, xref_cache)) for page_number in page_numbers]
+    finally:
+        doc.close()
+
+
+_context = None
+
+
+def _pool_context():
+    global _context
+    if _context is None:
+        _context = multiprocessing.get_context(EXTRACTION_START_METHOD)
+        if EXTRACTION_START_METHOD == "forkserver":
+            _context.set_forkserver_preload(["extraction"])
+    return _context
+
+
+def _pool_size(requested_workers, page_count, payload_mb, max_memory_mb):
+    """Caps the worker count by page count and by the memory budget."""
+    per_worker_mb = EXTRACTION_WORKER_BASE_MB + payload_mb
+    by_memory = max(1, max_memory_mb // max(per_worker_mb, 1))
+    by_tasks = -(-page_count // PAGES_PER_TASK)
+    return max(1, min(requested_workers, by_memory, by_tasks))
+
+
+def extraction_version():
+    """Identifies everything that changes extract_page() output, for stored page artifacts."""
+    return "|".join(str(v) for v in (
+        OCR_CACHE_VERSION, OCR_LANG, OCR_MIN_TEXT_CHARS, OCR_MIN_TEXT_COVERAGE, OCR_SKIP_MAX_AREA,
+        OCR_FULL_MIN_AREA, OCR_MIN_IMAGE_PX, OCR_MIN_DPI, OCR_DOWNSAMPLE_MAX_SIDE, OCR_FULL_MAX_SIDE,
+    ))
+
+
+def extract_pages(pdf_source, workers=None, max_memory_mb=None, page_numbers=None):
+    """
+    Extracts the raw text (and OCR decisions) of every page of a PDF, or only of the
+    1-based `page_numbers` when given.
+
+    `pdf_source` is a path or the PDF bytes. With more than one worker the pages are
+    spread over a process pool; every worker opens the PDF on its own (by path, or from
+    a shared-memory copy of the bytes). Returns [(page_number, extract_page(...)), ...]
+    in page order, exactly as the serial loop would.
+    """
+    workers = EXTRACTION_WORKERS if workers is None else workers
+    max_memory_mb = EXTRACTION_MAX_MEMORY_MB if max_memory_mb is None else max_memory_mb
+
+    doc = open_pdf(pdf_source)
+    if page_numbers is None:
+        page_numbers = list(range(1, doc.page_count + 1))
+    else:
+        page_numbers = sorted(page_numbers)
+    page_count = len(page_numbers)
+    if not page_count:
+        doc.close()
+        return []
+
+    if workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+        xref_cache = {}
+        try:
+            return [(n, extract_page(doc[n - 1], doc, xref_cache)) for n in page_numbers]
+        finally:
+            doc.close()
+    doc.close()
+
+    shm = None
+    task_source = pdf_source
+    payload_mb = 0
+    if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+        # Copy the PDF once into shared memory; tasks only carry its name.
+        size = len(pdf_source)
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        shm.buf[:size] = pdf_source
+        task_source = ("shm", shm.name, size)
+        payload_mb = size // (1024 * 1024)
+    pool_size = _pool_size(workers, page_count, payload_mb, max_memory_mb)
+
+    page_groups = [page_numbers[i:i + PAGES_PER_TASK] for i in range(0, page_count, PAGES_PER_TASK)]
+    print(f"[INFO] Extracting {page_count} pages with {pool_size} worker(s) in {len(page_groups)} task(s)")
+
+    ctx = _pool_context()
+    pool_options = {}
+    if ctx.get_start_method() != "fork":
+        pool_options["max_tasks_per_child"] = MAX_TASKS_PER_WORKER
+    results = {}
+    try:
+        with ProcessPoolExecutor(max_workers=pool_size, mp_context=ctx, **pool_options) as executor:
+            futures = [executor.submit(_extract_pages_task, task_source, group) for group in page_groups]
+            for future in futures:
+                for page_number, page_result in future.result():
+                    results[page_number] = page_result
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    return [(page_number, results[page_number]) for page_number in page_numbers]
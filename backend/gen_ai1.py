@@ -1,5 +1,5 @@
-from pinecone import Pinecone
 import os
+import numpy as np
 from langchain_huggingface import HuggingFaceEmbeddings
 from dotenv import load_dotenv
 from langchain.prompts import ChatPromptTemplate
@@ -7,65 +7,140 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.output_parsers import StrOutputParser
 from langchain.schema import Document
-from pinecone import ServerlessSpec
+from concurrent.futures import ThreadPoolExecutor
+from embedding_cache import embed_with_cache, embedding_cache_stats, QueryEmbeddingLRU
+from vector_store import get_vector_store, VECTOR_DIMENSION
+from model_registry import register_model, get_model
+import inference_client
 
 load_dotenv()
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-# Validate API keys
-if not PINECONE_API_KEY:
-    raise ValueError("❌ PINECONE_API_KEY not found in environment variables")
+# Validate API keys (the Pinecone key is checked by the Pinecone vector store itself)
 if not GEMINI_API_KEY:
     raise ValueError("❌ GEMINI_API_KEY not found in environment variables")
 
 os.environ["GOOGLE_API_KEY"] = GEMINI_API_KEY
 
-pc = Pinecone(api_key=PINECONE_API_KEY)
-
-index_name = "quickstart"
-if not pc.has_index(index_name):
-    pc.delete_index(index_name)
-    pc.create_index(
-        name=index_name,
-        dimension=384,
-        metric="cosine",
-        spec=ServerlessSpec(cloud="aws", region="us-east-1")
+# Chunks per encoder forward pass; MiniLM on CPU saturates around 32-64.
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+# Vectors per upsert request. Pinecone caps a request at 1000 vectors / 2 MB and each
+# vector carries its chunk text as metadata, so stay well below that.
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", "4"))
+# In-memory LRU for user question embeddings; QUERY_CACHE_PERSIST=1 also keeps them on disk.
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_PERSIST = os.getenv("QUERY_CACHE_PERSIST", "0") == "1"
+
+EMBED_MODEL_ID = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+# A local copy (e.g. baked into the image) is used when present; otherwise the model is
+# read from the Hugging Face cache. Nothing is written at startup.
+EMBED_MODEL_PATH = os.getenv("EMBED_MODEL_PATH", "./models/paraphrase-multilingual-MiniLM-L12-v2")
+
+
+def load_encoder():
+    return HuggingFaceEmbeddings(
+        model_name=EMBED_MODEL_PATH if os.path.isdir(EMBED_MODEL_PATH) else EMBED_MODEL_ID,
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"batch_size": EMBED_BATCH_SIZE},
     )
 
-index = pc.Index(index_name)
 
-from sentence_transformers import SentenceTransformer
-model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
-model.save("./models/paraphrase-multilingual-MiniLM-L12-v2")
+register_model("embedder", load_encoder)
 
-encoder = HuggingFaceEmbeddings(
-    model_name="./models/paraphrase-multilingual-MiniLM-L12-v2",
-    model_kwargs={"device": "cpu"}
-)
 
+def get_encoder():
+    return get_model("embedder")
 
-def encode(pdf_id, page_numb, docs, encoder=encoder):
-    """Embed and store document chunks"""
-    if not docs:
-        print("⚠️  No documents to encode")
-        return
 
-    try:
-        embeddings = encoder.embed_documents(docs)
-        vectors = [
-            (str(f"{pdf_id}_{page_numb}_{i}"), emb, {
+def _embed_documents(texts):
+    if inference_client.enabled():
+        return inference_client.embed(texts)
+    return get_encoder().embed_documents(texts)
+
+
+def _embed_queries(texts):
+    # The server embeds queries like documents, which is the same for this encoder.
+    if inference_client.enabled():
+        return inference_client.embed(texts)
+    return [get_encoder().embed_query(t) for t in texts]
+
+_upsert_executor = ThreadPoolExecutor(max_workers=UPSERT_WORKERS, thread_name_prefix="upsert")
+
+
+def _upsert_batch(vectors, namespace):
+    get_vector_store().upsert(vectors, namespace=namespace)
+    return len(vectors)
+
+
+def encode_document(pdf_id, page_chunks, encoder=None, wait=True):
+    """
+    Embed every chunk of a document in one batch and store them with bulk upserts.
+
+    `page_chunks` is [(page_no, [chunk_text, ...]), ...]. Upserts are split into
+    UPSERT_BATCH_SIZE requests and sent from a thread pool. With wait=False the
+    futures are returned straight away so the caller can keep working; pass them to
+    wait_for_upserts() before querying the index.
+
+    Returns (futures, vectors); `vectors` are the (id, embedding, metadata) tuples
+    being stored, e.g. for top_k_from_vectors().
+    """
+    texts, metadata = [], []
+    for page_numb, docs in page_chunks:
+        for i, doc in enumerate(docs):
+            texts.append(doc)
+            metadata.append((str(f"{pdf_id}_{page_numb}_{i}"), {
                 "pdf_id": str(pdf_id),
                 "chunk_index": i,
                 "page_no": page_numb,
-                "text": docs[i]
-            })
-            for i, emb in enumerate(embeddings)
-        ]
-        index.upsert(vectors,namespace=str(pdf_id))
-        print(f"✅ {len(vectors)} chunks stored in Pinecone for {pdf_id} page {page_numb}")
+                "text": doc
+            }))
+    if not texts:
+        print("⚠️  No documents to encode")
+        return [], []
+
+    try:
+        # Repeated boilerplate chunks are served from the embedding cache.
+        # The encoder is only loaded if some chunk is missing from the cache.
+        embed_fn = encoder.embed_documents if encoder else _embed_documents
+        embeddings = embed_with_cache(texts, embed_fn, EMBED_MODEL_ID)
     except Exception as e:
         print(f"❌ Error encoding documents: {e}")
+        return [], []
+
+    vectors = [(vec_id, emb, meta) for (vec_id, meta), emb in zip(metadata, embeddings)]
+    futures = [
+        _upsert_executor.submit(_upsert_batch, vectors[start:start + UPSERT_BATCH_SIZE], str(pdf_id))
+        for start in range(0, len(vectors), UPSERT_BATCH_SIZE)
+    ]
+    print(f"📤 Upserting {len(vectors)} chunks for {pdf_id} in {len(futures)} request(s)")
+    if wait:
+        wait_for_upserts(futures, pdf_id)
+        return [], vectors
+    return futures, vectors
+
+
+def wait_for_upserts(futures, pdf_id=""):
+    """Blocks until the given upserts finish; returns the number of vectors stored."""
+    stored = 0
+    for future in futures:
+        try:
+            stored += future.result()
+        except Exception as e:
+            print(f"❌ Error upserting vectors for {pdf_id}: {e}")
+    if futures:
+        print(f"✅ {stored} chunks stored in the vector store for {pdf_id}")
+    return stored
+
+
+def encode(pdf_id, page_numb, docs, encoder=None):
+    """Embed and store document chunks"""
+    encode_document(pdf_id, [(page_numb, docs)], encoder=encoder)
+
+
+def delete_document_vectors(pdf_id):
+    """Removes every stored chunk of a document."""
+    get_vector_store().delete_document(str(pdf_id))
 
 query = (
     "Key organizational operations, critical urgent tasks and deadlines, compliance and regulatory updates, "
@@ -76,13 +151,45 @@ query = (
     "സാമ്പത്തിക പ്രകടനം, ബജറ്റുകൾ, പേയ്‌മെന്റുകൾ, ഓഡിറ്റുകൾ, ചെലവ് നിയന്ത്രണം, ഫണ്ടിംഗ്, വാങ്ങൽ ധനകാര്യം."
 )
 
-def query_pinecone_top_k(pdf_id, top_k=10, query=query):
-    """Query Pinecone for relevant chunks"""
-    print(f"\n🔍 Querying Pinecone for pdf_id: {pdf_id}")
+_query_cache = QueryEmbeddingLRU(QUERY_CACHE_SIZE, persist=QUERY_CACHE_PERSIST)
+_summary_query_embedding = None
+
+
+def warm_summary_query():
+    """Embeds the fixed summary query once; every document summary reuses it."""
+    global _summary_query_embedding
+    if _summary_query_embedding is None:
+        _summary_query_embedding = embed_with_cache(
+            [query], _embed_queries, EMBED_MODEL_ID, kind="query"
+        )[0]
+    return _summary_query_embedding
+
+
+def embed_query(text, encoder=None):
+    """Query embedding: precomputed for the summary query, LRU-cached for user questions."""
+    if text == query:
+        return warm_summary_query()
+    embed_fn = (lambda texts: [encoder.embed_query(t) for t in texts]) if encoder else _embed_queries
+    return _query_cache.get_or_embed(text, embed_fn, EMBED_MODEL_ID)
+
+
+def cache_stats():
+    """Hit/miss metrics of the embedding caches, for sizing them."""
+    return {
+        "summary_query_precomputed": _summary_query_embedding is not None,
+        "query_lru": _query_cache.stats(),
+        "embedding": embedding_cache_stats(),
+    }
+
+
+def query_top_k(pdf_id, top_k=10, query=query):
+    """Query the vector store for relevant chunks"""
+    print(f"\n🔍 Querying vector store for pdf_id: {pdf_id}")
 
     try:
-        q_emb = encoder.embed_query(query)
-        results = index.query(
+        store = get_vector_store()
+        q_emb = embed_query(query)
+        results = store.query(
             vector=q_emb,
             top_k=top_k,
             include_metadata=True,
@@ -100,8 +207,8 @@ def query_pinecone_top_k(pdf_id, top_k=10, query=query):
 
         if not docs:
             print("⚠️  No relevant chunks found with semantic search, fetching all chunks...")
-            all_results = index.query(
-                vector=[0.0] * 384,
+            all_results = store.query(
+                vector=[0.0] * VECTOR_DIMENSION,
                 top_k=top_k,
                 include_metadata=True,
                 namespace=str(pdf_id)
@@ -115,7 +222,7 @@ def query_pinecone_top_k(pdf_id, top_k=10, query=query):
                 if match["metadata"].get("text", "").strip()
             ]
 
-        print(f"✅ Retrieved {len(docs)} chunks from Pinecone")
+        print(f"✅ Retrieved {len(docs)} chunks from the vector store")
 
         # Debug: Print first chunk preview
         if docs:
@@ -126,9 +233,32 @@ def query_pinecone_top_k(pdf_id, top_k=10, query=query):
         return docs
 
     except Exception as e:
-        print(f"❌ Error querying Pinecone: {e}")
+        print(f"❌ Error querying vector store: {e}")
         return []
 
+
+def top_k_from_vectors(vectors, top_k=10, query=query):
+    """
+    Same retrieval as query_top_k, but over a document's freshly computed vectors in
+    memory, so the summary does not have to wait for the upserts to land.
+    """
+    if not vectors:
+        return []
+    q = np.asarray(embed_query(query), dtype=np.float32)
+    matrix = np.asarray([v[1] for v in vectors], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(q) or 1.0)
+    scores = (matrix @ q) / np.where(norms == 0, 1.0, norms)
+    top = np.argsort(-scores, kind="stable")[:top_k]
+    return [
+        Document(page_content=vectors[i][2]["text"], metadata=vectors[i][2])
+        for i in top
+        if vectors[i][2].get("text", "").strip()
+    ]
+
+
+# Kept for callers written against the Pinecone-only version.
+query_pinecone_top_k = query_top_k
+
 prompt = ChatPromptTemplate.from_messages([
     (
         "system",
@@ -158,16 +288,17 @@ output_parser = StrOutputParser()
 chain = create_stuff_documents_chain(llm, prompt=prompt, output_parser=output_parser)
 
 
-def create_summary(pdf_id):
-    """Generate summary from retrieved chunks"""
+def create_summary(pdf_id, docs=None):
+    """Generate summary from retrieved chunks (or from `docs` when already selected)"""
     print(f"\n📝 Generating summary for {pdf_id}...")
 
     try:
         # Step 1: Retrieve chunks
-        docs = query_pinecone_top_k(pdf_id)
+        if docs is None:
+            docs = query_top_k(pdf_id)
 
         if not docs:
-            error_msg = f"❌ No documents found in Pinecone for pdf_id: {pdf_id}"
+            error_msg = f"❌ No documents found in the vector store for pdf_id: {pdf_id}"
             print(error_msg)
             return error_msg
 
@@ -0,0 +1,32 @@
+# backend/gunicorn.conf.py
+# With GUNICORN_PRELOAD=1 (default) the app and its models are loaded once in the
+# master process and shared copy-on-write by every worker, so adding a worker only
+# costs its request-handling memory.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '7860')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+# Comma-separated registry names to load in the master (default: the API's own models).
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "")
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker is forked.
+    if not preload_app:
+        return
+    import main
+    from model_registry import registry, memory_report
+
+    names = [n.strip() for n in PRELOAD_MODELS.split(",") if n.strip()] or main.API_MODELS
+    # Load only; no inference in the master, so no thread pools exist before fork.
+    registry.warmup(names, background=False)
+    registry.prepare_for_fork()
+    server.log.info(f"Preloaded models {names} in master: {memory_report()}")
+
+
+def post_fork(server, worker):
+    from model_registry import memory_report
+    server.log.info(f"Worker {worker.pid} started: {memory_report()}")
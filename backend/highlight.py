@@ -0,0 +1,208 @@
+# backend/highlight.py
+# Highlights many terms (deadline / financial sentences) in one pass per page: the page's
+# words are read once and every term is matched at the same time with an Aho-Corasick
+# automaton over word tokens, instead of one page.search_for() per term. Scanned content
+# is matched against the OCR word boxes extraction already produced, so nothing is
+# rendered or OCR'd again here.
+#
+# The result is an "overlay": compact per-page highlight rectangles stored with the
+# document. The annotated PDF is only rendered from it when someone asks for it.
+import os
+import shutil
+import tempfile
+from collections import deque
+
+import pymupdf
+
+from extraction import open_pdf
+
+# Bump when the overlay format changes.
+OVERLAY_VERSION = 1
+
+
+def _norm(word):
+    return word.casefold()
+
+
+class TermMatcher:
+    """Aho-Corasick automaton over word tokens; matches are case-insensitive."""
+
+    def __init__(self, terms):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for term in set(terms):
+            tokens = [_norm(w) for w in str(term).split()]
+            if not tokens:
+                continue
+            node = 0
+            for token in tokens:
+                nxt = self.goto[node].get(token)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][token] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            if len(tokens) not in self.out[node]:
+                self.out[node].append(len(tokens))
+
+        # Failure links, breadth first; each node also reports its suffixes' matches.
+        pending = deque(self.goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for token, child in self.goto[node].items():
+                fallback = self.fail[node]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(token, 0)
+                self.out[child] = self.out[child] + [n for n in self.out[self.fail[child]]
+                                                     if n not in self.out[child]]
+                pending.append(child)
+
+    def __bool__(self):
+        return len(self.goto) > 1
+
+    def find(self, words):
+        """(start, end) word index ranges of every term occurrence in `words`."""
+        matches = []
+        node = 0
+        for i, word in enumerate(words):
+            token = _norm(word)
+            while node and token not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(token, 0)
+            for length in self.out[node]:
+                matches.append((i - length + 1, i + 1))
+        return matches
+
+
+def _line_rects(words, start, end):
+    """One rect per line covered by words[start:end]; words are (x0, y0, x1, y1, text, line)."""
+    rects = {}
+    for x0, y0, x1, y1, _, line in words[start:end]:
+        rect = pymupdf.Rect(x0, y0, x1, y1)
+        rects[line] = rects[line] | rect if line in rects else rect
+    return list(rects.values())
+
+
+def page_words(page):
+    """
+    The page's text-layer words as (x0, y0, x1, y1, text, line), in content-stream order:
+    the same order get_text("text") extracts them in, so terms found in the extracted text
+    are found here as consecutive words too.
+    """
+    return [(w[0], w[1], w[2], w[3], w[4], f"{w[5]}.{w[6]}") for w in page.get_text("words", sort=False)]
+
+
+def _page_highlights(page, matcher, ocr_words=None):
+    """Rect lists (one list per term occurrence) for one page."""
+    highlights = []
+    # OCR'd words are matched separately so no match spans the text layer and an image.
+    for words in (page_words(page), [tuple(w) for w in ocr_words or []]):
+        for start, end in matcher.find([w[4] for w in words]):
+            highlights.append([[round(v, 1) for v in rect] for rect in _line_rects(words, start, end)])
+    return highlights
+
+
+def build_overlay(doc, terms, ocr_words=None):
+    """
+    Highlight overlay of `terms` in the open `doc`. `ocr_words` maps 1-based page
+    numbers to extract_page()'s "ocr_words". Only pages with highlights are listed:
+
+        {"version": 1, "pages": {"3": {"size": [w, h], "rotation": 0,
+                                       "highlights": [[[x0, y0, x1, y1], ...], ...]}}}
+
+    Each highlight is one term occurrence, one rect per line it covers, in PyMuPDF
+    page coordinates (points, origin top-left of the unrotated page).
+    """
+    overlay = {"version": OVERLAY_VERSION, "pages": {}}
+    matcher = TermMatcher(terms)
+    if not matcher:
+        return overlay
+    ocr_words = ocr_words or {}
+    for page_number, page in enumerate(doc, start=1):
+        highlights = _page_highlights(page, matcher, ocr_words.get(page_number))
+        if highlights:
+            overlay["pages"][str(page_number)] = {
+                "size": [round(page.rect.width, 1), round(page.rect.height, 1)],
+                "rotation": page.rotation,
+                "highlights": highlights,
+            }
+    return overlay
+
+
+def overlay_count(overlay):
+    return sum(len(page["highlights"]) for page in (overlay or {}).get("pages", {}).values())
+
+
+def apply_overlay(doc, overlay):
+    """Adds one highlight annotation per overlay highlight to the open `doc`. Returns the count."""
+    count = 0
+    for page_number, page_overlay in (overlay or {}).get("pages", {}).items():
+        page = doc[int(page_number) - 1]
+        for rects in page_overlay["highlights"]:
+            annot = page.add_highlight_annot([pymupdf.Rect(rect) for rect in rects])
+            if annot is not None:
+                annot.update()
+                count += 1
+    return count
+
+
+def render_highlighted(pdf_source, overlay, output_path=None):
+    """
+    The PDF (path, bytes or open document) with `overlay` applied, saved to
+    `output_path` and returned, or returned as bytes with output_path=None.
+    From a path or bytes the annotations are appended as an incremental update, so
+    the original bytes are kept as they are and nothing is recompressed.
+    """
+    if isinstance(pdf_source, pymupdf.Document):
+        apply_overlay(pdf_source, overlay)
+        if output_path is None:
+            return pdf_source.tobytes(garbage=1, deflate=True)
+        pdf_source.save(output_path)
+        return output_path
+
+    if output_path is None:
+        with tempfile.TemporaryDirectory(prefix="highlight-") as workdir:
+            path = render_highlighted(pdf_source, overlay, os.path.join(workdir, "highlighted.pdf"))
+            with open(path, "rb") as f:
+                return f.read()
+
+    if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+        with open(output_path, "wb") as f:
+            f.write(pdf_source)
+    elif os.path.abspath(pdf_source) != os.path.abspath(output_path):
+        shutil.copyfile(pdf_source, output_path)
+    doc = pymupdf.open(output_path)
+    try:
+        apply_overlay(doc, overlay)
+        if doc.can_save_incrementally():
+            doc.save(output_path, incremental=True, encryption=pymupdf.PDF_ENCRYPT_KEEP)
+            return output_path
+        # Damaged/repaired files cannot be appended to; write them out in full.
+        data = doc.tobytes(garbage=1, deflate=True)
+    finally:
+        doc.close()
+    with open(output_path, "wb") as f:
+        f.write(data)
+    return output_path
+
+
+def highlight_text(pdf_source, terms, output_path="highlighted.pdf", ocr_words=None):
+    """
+    Highlights `terms` in a PDF given as a path, bytes or an already open document.
+    Saves to `output_path` and returns it, or with output_path=None returns the
+    highlighted PDF as bytes. A document passed in open is left open.
+    """
+    if isinstance(pdf_source, pymupdf.Document):
+        overlay = build_overlay(pdf_source, terms, ocr_words)
+    else:
+        doc = open_pdf(pdf_source)
+        try:
+            overlay = build_overlay(doc, terms, ocr_words)
+        finally:
+            doc.close()
+    print(f"[INFO] Highlighted {overlay_count(overlay)} occurrence(s) of {len(set(terms))} term(s)")
+    return render_highlighted(pdf_source, overlay, output_path)
@@ -0,0 +1,60 @@
+# backend/highlight_cache.py
+# Highlighted PDFs are no longer produced at ingestion: the document row keeps a small
+# highlight overlay (see highlight.py) and the annotated PDF is rendered the first time
+# someone opens it, then kept in this size-bounded LRU cache.
+import hashlib
+import json
+import os
+
+from disk_cache import DiskLRUCache
+
+HIGHLIGHT_CACHE_PATH = os.getenv("HIGHLIGHT_CACHE_PATH", os.path.join("cache", "highlight_cache.sqlite3"))
+HIGHLIGHT_CACHE_MAX_MB = int(os.getenv("HIGHLIGHT_CACHE_MAX_MB", "512"))
+# Absolute base URL of this API, for links stored in documents.highlighted_file_path.
+# Empty: links are stored relative ("/documents/<id>/highlighted.pdf").
+API_PUBLIC_URL = os.getenv("API_PUBLIC_URL", "").rstrip("/")
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = DiskLRUCache(HIGHLIGHT_CACHE_PATH, HIGHLIGHT_CACHE_MAX_MB * 1024 * 1024, name="highlight")
+    return _cache
+
+
+def highlighted_pdf_url(document_id):
+    return f"{API_PUBLIC_URL}/documents/{document_id}/highlighted.pdf"
+
+
+def highlight_cache_key(source_key, overlay):
+    """`source_key` names the original PDF (its content hash); the overlay is hashed in."""
+    digest = hashlib.sha256(json.dumps(overlay, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    return f"{source_key}|{digest.hexdigest()}"
+
+
+def cached_highlighted_pdf(source_key, overlay, render):
+    """
+    Returns the highlighted PDF bytes, calling `render()` only on a cache miss.
+    Failures of the cache itself never fail the render.
+    """
+    key = highlight_cache_key(source_key, overlay)
+    try:
+        cached = get_cache().get(key)
+    except Exception as e:
+        print(f"[WARNING] Highlight cache read failed: {e}")
+        cached = None
+    if cached is not None:
+        return cached
+
+    pdf_bytes = render()
+    try:
+        get_cache().set(key, pdf_bytes)
+    except Exception as e:
+        print(f"[WARNING] Highlight cache write failed: {e}")
+    return pdf_bytes
+
+
+def highlight_cache_stats():
+    return get_cache().stats()
@@ -0,0 +1,72 @@
+# backend/inference_client.py
+# Client for inference_server.py. When INFERENCE_URL is set, the pipeline, gen_ai1 and
+# ner_functions send classify / embed / ner calls to the shared inference server instead
+# of running (and loading) the models in this process.
+#
+#   INFERENCE_URL=unix:///tmp/kmrl-inference.sock   or   INFERENCE_URL=http://127.0.0.1:8600
+import os
+import threading
+
+import httpx
+
+INFERENCE_URL = os.getenv("INFERENCE_URL", "")
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "300"))
+
+_client = None
+_client_lock = threading.Lock()
+_disabled = False
+
+
+def enabled():
+    return bool(INFERENCE_URL) and not _disabled
+
+
+def disable():
+    """Forces local inference in this process (used by the inference server itself)."""
+    global _disabled
+    _disabled = True
+
+
+def _get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            if INFERENCE_URL.startswith("unix://"):
+                transport = httpx.HTTPTransport(uds=INFERENCE_URL[len("unix://"):])
+                _client = httpx.Client(transport=transport, base_url="http://inference", timeout=INFERENCE_TIMEOUT)
+            else:
+                _client = httpx.Client(base_url=INFERENCE_URL, timeout=INFERENCE_TIMEOUT)
+    return _client
+
+
+def _post(path, payload):
+    response = _get_client().post(path, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+def classify(input_ids):
+    """Logits (list of lists) for already-tokenized chunks."""
+    if not input_ids:
+        return []
+    return _post("/classify", {"input_ids": [list(ids) for ids in input_ids]})["logits"]
+
+
+def embed(texts):
+    """Embeddings for `texts` (documents and queries share the same encoder)."""
+    if not texts:
+        return []
+    return _post("/embed", {"texts": list(texts)})["vectors"]
+
+
+def ner(texts):
+    """ner_extraction_multilingual() results for each text."""
+    if not texts:
+        return []
+    return _post("/ner", {"texts": list(texts)})["results"]
+
+
+def health():
+    response = _get_client().get("/health")
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,210 @@
+# backend/inference_server.py
+# Local inference service: one process holds the classifier, embedder and NER models and
+# serves every API / ingestion worker. Concurrent requests are merged into micro-batches,
+# so many lightweight workers share one well-batched CPU engine.
+#
+#   python -u inference_server.py                      # Unix socket (INFERENCE_SOCKET)
+#   python -u inference_server.py --port 8600          # localhost HTTP
+#
+# Clients: inference_client.py (set INFERENCE_URL in the workers).
+import argparse
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import List
+
+import uvicorn
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+import inference_client
+from model_registry import registry, memory_report
+
+# This process *is* the inference service; never forward to another one (or itself).
+inference_client.disable()
+
+INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET", "/tmp/kmrl-inference.sock")
+# A batch is run as soon as it holds MAX_BATCH items or its first item has waited MAX_WAIT_MS.
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "64"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+INFERENCE_NER_MAX_BATCH = int(os.getenv("INFERENCE_NER_MAX_BATCH", "16"))
+
+
+class MicroBatcher:
+    """
+    Collects items from concurrent callers and runs `batch_fn(items) -> results` on
+    groups of up to `max_batch` items, waiting at most `max_wait_ms` for a batch to fill.
+    Each caller gets back the results for its own items, in order.
+    """
+
+    def __init__(self, name, batch_fn, max_batch=INFERENCE_MAX_BATCH, max_wait_ms=INFERENCE_MAX_WAIT_MS):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.requests = 0
+        self._thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, items):
+        """Queues `items` and returns a Future of their results."""
+        future = Future()
+        if not items:
+            future.set_result([])
+            return future
+        self._queue.put((list(items), future))
+        return future
+
+    def __call__(self, items):
+        return self.submit(items).result()
+
+    def _collect(self):
+        requests = [self._queue.get()]
+        size = len(requests[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            requests.append(request)
+            size += len(request[0])
+        return requests
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+            items = [item for request_items, _ in requests for item in request_items]
+            try:
+                results = []
+                # A single large request can exceed max_batch; run it in slices.
+                for start in range(0, len(items), self.max_batch):
+                    results.extend(self.batch_fn(items[start:start + self.max_batch]))
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(items)
+            self.requests += len(requests)
+            offset = 0
+            for request_items, future in requests:
+                future.set_result(results[offset:offset + len(request_items)])
+                offset += len(request_items)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+def _classify_batch(input_ids):
+    import pipeline
+    tokenizer, model = registry.get("classifier")
+    _, logits = pipeline.classify_chunk_ids(input_ids, tokenizer, model)
+    return logits.tolist()
+
+
+def _embed_batch(texts):
+    import gen_ai1
+    return [list(map(float, v)) for v in gen_ai1.get_encoder().embed_documents(texts)]
+
+
+def _ner_batch(texts):
+    import ner_functions
+    return ner_functions.ner_extraction_multilingual_batch(texts)
+
+
+batchers = {}
+
+
+def get_batchers():
+    if not batchers:
+        batchers["classify"] = MicroBatcher("classify", _classify_batch)
+        batchers["embed"] = MicroBatcher("embed", _embed_batch)
+        batchers["ner"] = MicroBatcher("ner", _ner_batch, max_batch=INFERENCE_NER_MAX_BATCH)
+    return batchers
+
+
+class ClassifyRequest(BaseModel):
+    input_ids: List[List[int]]
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+
+
+class NerRequest(BaseModel):
+    texts: List[str]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    import pipeline  # registers the classifier, spaCy and IndicNER loaders
+    import gen_ai1  # registers the embedder
+    registry.warmup(["classifier", "embedder", "spacy_en", "indic_ner"], background=False)
+    get_batchers()
+    print(f"[INFO] Inference server ready: {memory_report()}")
+
+    yield
+
+    print("[INFO] Inference server shutting down.")
+
+
+app = FastAPI(title="KMRL inference server", lifespan=lifespan)
+
+
+@app.post("/classify")
+def classify(request: ClassifyRequest):
+    """Logits for already-tokenized chunks (input_ids with special tokens)."""
+    return {"logits": get_batchers()["classify"](request.input_ids)}
+
+
+@app.post("/embed")
+def embed(request: EmbedRequest):
+    return {"vectors": get_batchers()["embed"](request.texts)}
+
+
+@app.post("/ner")
+def ner(request: NerRequest):
+    """Deadline / financial sentences per text, as ner_extraction_multilingual returns them."""
+    return {"results": get_batchers()["ner"](request.texts)}
+
+
+@app.get("/health")
+def health():
+    return {
+        "ready": registry.is_ready(["classifier", "embedder", "spacy_en", "indic_ner"]),
+        "models": registry.status(),
+        "batching": {name: b.stats() for name, b in batchers.items()},
+        "memory": memory_report(),
+    }
+
+
+# --- MAIN LOOP ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local micro-batching inference server")
+    parser.add_argument("--socket", default=INFERENCE_SOCKET, help="Unix socket path (default)")
+    parser.add_argument("--port", type=int, default=None, help="Serve on 127.0.0.1:PORT instead of the socket")
+    args = parser.parse_args()
+
+    if args.port:
+        uvicorn.run(app, host="127.0.0.1", port=args.port, workers=1)
+    else:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        uvicorn.run(app, uds=args.socket, workers=1)
@@ -0,0 +1,212 @@
+# backend/ingestion.py
+# Document ingestion jobs: everything that used to run inside the /documents/upload
+# request now runs here, in worker processes that poll the ingestion_jobs table.
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+import crud
+import gen_ai1
+import inference_client
+from database import SessionLocal
+from pipeline import pipeline_process_pdf, load_all_models, StageTimer
+from model_registry import registry as model_registry, memory_report
+from supabase_utils import upload_file_to_supabase
+from highlight import overlay_count
+from highlight_cache import highlighted_pdf_url
+
+# Seconds between polls when the queue is empty.
+INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", "2"))
+# A failing job is retried until it has been attempted this many times.
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+# A 'running' job whose worker has not reported progress for this long is taken over.
+INGEST_STALE_SECONDS = int(os.getenv("INGEST_STALE_SECONDS", "900"))
+# Running jobs refresh updated_at this often (well under INGEST_STALE_SECONDS), so a long
+# single stage is not mistaken for a dead worker.
+INGEST_HEARTBEAT_SECONDS = float(os.getenv("INGEST_HEARTBEAT_SECONDS", "30"))
+# PDFs up to this size are processed straight from memory; larger ones are written once
+# into the job's own temp directory so extraction workers can open them by path.
+INGEST_SPOOL_MAX_MB = int(os.getenv("INGEST_SPOOL_MAX_MB", "32"))
+
+
+def make_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class JobProgress:
+    """progress(stage, status, seconds) callback that writes to the job's database row."""
+
+    def __init__(self, db, job_id):
+        self.db = db
+        self.job_id = job_id
+
+    def __call__(self, stage, status, seconds=None):
+        crud.update_ingestion_job_stage(self.db, self.job_id, stage, status, seconds)
+
+
+class JobHeartbeat:
+    """
+    Background thread (own DB session) that keeps a running job's updated_at fresh.
+    `lost` is set if another worker took the job over.
+    """
+
+    def __init__(self, job_id, worker_id, interval=INGEST_HEARTBEAT_SECONDS):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job_id}", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            db = SessionLocal()
+            try:
+                if not crud.heartbeat_ingestion_job(db, self.job_id, self.worker_id):
+                    print(f"[WARNING] Job {self.job_id}: taken over by another worker")
+                    self.lost.set()
+                    return
+            except Exception as e:
+                print(f"[WARNING] Job {self.job_id}: heartbeat failed: {e}")
+            finally:
+                db.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_job(db, job, ml_models):
+    """Processes one claimed job end to end."""
+    with JobHeartbeat(job.id, job.worker_id) as heartbeat:
+        _run_job(db, job, ml_models, heartbeat)
+
+
+def _run_job(db, job, ml_models, heartbeat):
+    worker_id = job.worker_id
+    progress = JobProgress(db, job.id)
+    timer = StageTimer(progress)
+    wall_start = time.perf_counter()
+    workdir = None
+    # One buffer per job, shared (not copied) by the storage upload and PyMuPDF. This is
+    # the only place the (deferred) payload column is loaded.
+    payload = bytes(job.payload)
+    pdf_id = os.path.splitext(os.path.basename(job.filename))[0]
+    print(f"[INFO] Job {job.id}: processing '{job.filename}' (attempt {job.attempts})")
+    try:
+        # --- 1. Upload Original File to Cloud (in the background, overlapping the ML pipeline) ---
+        original_upload = timer.start_background(
+            "upload_original", upload_file_to_supabase, payload, job.filename
+        )
+
+        # --- 2. Run ML Pipeline (from memory, or a per-job temp file for large PDFs) ---
+        pdf_source = payload
+        if len(payload) > INGEST_SPOOL_MAX_MB * 1024 * 1024:
+            workdir = tempfile.mkdtemp(prefix=f"ingest-{job.id}-")
+            pdf_source = os.path.join(workdir, os.path.basename(job.filename))
+            with open(pdf_source, "wb") as buffer:
+                buffer.write(payload)
+
+        with timer.stage("ml_pipeline"):
+            ml_results = pipeline_process_pdf(
+                pdf_path=pdf_source,
+                clf_tokenizer=ml_models["tokenizer"],
+                clf_model=ml_models["model"],
+                nlp_model=ml_models["nlp_model"],
+                output_dir=workdir,
+                progress=progress,
+                pdf_id=pdf_id,
+                render_pdf=False,
+            )
+
+        if not timer.finish_background("upload_original", original_upload):
+            raise RuntimeError("Could not upload file to cloud storage.")
+
+        # --- 3. Highlights ---
+        # Only the overlay is stored; GET /documents/{id}/highlighted.pdf renders the
+        # highlighted PDF from it on first request.
+        highlighted_url = None
+        if overlay_count(ml_results.get("highlight_overlay")):
+            highlighted_url = highlighted_pdf_url(job.document_id)
+
+        # --- 4. Update the Database Record with ML Results ---
+        with timer.stage("save_results"):
+            # Only while we still own the job; the row lock holds until the results commit.
+            owned = not heartbeat.lost.is_set() and crud.lock_owned_ingestion_job(db, job.id, worker_id)
+            if not owned:
+                db.rollback()
+                print(f"[WARNING] Job {job.id}: no longer owned by {worker_id}; discarding results")
+                return
+            final_document = crud.update_document_with_ml_results(
+                db,
+                document_id=job.document_id,
+                ml_results=ml_results,
+                highlighted_file_path=highlighted_url,
+                vector_namespace=pdf_id
+            )
+
+        # --- 5. Create Notification for the Department ---
+        with timer.stage("notify"):
+            routed_department = final_document.department
+            if routed_department and routed_department != "Unknown":
+                crud.create_notification(
+                    db=db,
+                    document_id=final_document.id,
+                    department=routed_department,
+                    message=f"New document '{final_document.title}' has been assigned to your department."
+                )
+
+        totals = timer.totals(time.perf_counter() - wall_start)
+        crud.update_ingestion_job_stage(db, job.id, "total", "completed", totals["critical_path_seconds"], extra=totals)
+        print(f"[INFO] Job {job.id}: {totals['critical_path_seconds']}s critical path, "
+              f"{totals['stage_seconds_sum']}s of stage work")
+        crud.finish_ingestion_job(db, job.id, worker_id=worker_id)
+        print(f"[INFO] Job {job.id}: completed")
+    except Exception as e:
+        db.rollback()
+        retry = job.attempts < INGEST_MAX_ATTEMPTS
+        print(f"[ERROR] Job {job.id} failed: {e}" + (" (will retry)" if retry else ""))
+        finished = crud.finish_ingestion_job(db, job.id, error=str(e), retry=retry, worker_id=worker_id)
+        if finished is not None and not retry:
+            crud.set_document_status(db, job.document_id, "failed")
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def worker_loop(worker_id=None, run_once=False):
+    """Polls the queue forever (or until it is empty, with run_once=True)."""
+    worker_id = worker_id or make_worker_id()
+    print(f"[INFO] Ingestion worker {worker_id} loading ML models...")
+    tokenizer, model, nlp_model = load_all_models()
+    ml_models = {"tokenizer": tokenizer, "model": model, "nlp_model": nlp_model}
+    # Load the remaining models and embed the fixed summary query now rather than inside
+    # the first job (both are no-ops when preloaded by run_ingest_worker.py).
+    local_models = [] if inference_client.enabled() else ["indic_ner", "embedder"]
+    model_registry.warmup(local_models, then=gen_ai1.warm_summary_query, background=False)
+    print(f"[INFO] Ingestion worker {worker_id} ready. Model load times: "
+          f"{ {name: st.get('seconds') for name, st in model_registry.status().items()} }; "
+          f"memory: {memory_report()}")
+
+    while True:
+        db = SessionLocal()
+        try:
+            job = crud.claim_next_ingestion_job(db, worker_id, stale_after_seconds=INGEST_STALE_SECONDS,
+                                                max_attempts=INGEST_MAX_ATTEMPTS)
+            if job is not None:
+                run_job(db, job, ml_models)
+                continue
+        except Exception as e:
+            print(f"[ERROR] Ingestion worker {worker_id}: {e}")
+        finally:
+            db.close()
+        if run_once:
+            return
+        time.sleep(INGEST_POLL_SECONDS)
@@ -5,23 +5,22 @@ import uuid
 import auth
 # --- Standard Imports ---
 from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form
+from fastapi.responses import JSONResponse, RedirectResponse, Response
 from pydantic import BaseModel
 from database import engine, get_db, SessionLocal
 from datetime import datetime
 
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy import text
 import os
-import shutil # Important for file operations
+import hashlib
 
-from pipeline import highlight_text
 from ml_qna import qna as generate_ml_answer
 
 # from email_automation import download_attached_file
 # import imaplib
 from contextlib import asynccontextmanager
-from pipeline import pipeline_process_pdf, load_all_models
 from fastapi import BackgroundTasks
 
 # --- Middleware Import ---
@@ -32,20 +31,56 @@ import crud
 import models
 import schemas
 from database import engine, get_db
-from supabase_utils import upload_file_to_supabase
-
-# This creates/updates the database tables in your Neon database
-# based on your models.py file.
-models.Base.metadata.create_all(bind=engine)
-
-# --- (3) SETUP FOR LOADING MODELS ON STARTUP ---
-# This dictionary will hold our loaded models so we don't reload them on every request
-ml_models = {}
+from supabase_utils import get_public_url, copy_file_in_supabase, upload_file_to_supabase, download_file_from_supabase
+import gen_ai1
+import inference_client
+from ocr_cache import ocr_cache_stats
+from highlight import render_highlighted
+from highlight_cache import cached_highlighted_pdf, highlight_cache_stats, highlighted_pdf_url
+from model_registry import registry as model_registry, memory_report
+
+# Models the API process itself serves with (Q&A retrieval); document processing
+# models are loaded by the ingestion workers.
+API_MODELS = [] if inference_client.enabled() else ["embedder"]
+
+
+def init_database():
+    # This creates/updates the database tables in your Neon database
+    # based on your models.py file. Runs at startup, not on import.
+    models.Base.metadata.create_all(bind=engine)
+
+    # create_all() does not add columns to existing tables, so add the newer ones here.
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"))
+        conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS vector_namespace VARCHAR"))
+        conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS highlight_overlay JSON"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_documents_content_hash ON documents (content_hash)"))
+
+UPLOAD_READ_CHUNK = 1024 * 1024
+
+
+def read_upload(file: UploadFile):
+    """Reads an upload once, hashing it as it streams in. Returns (bytes, sha256 hex)."""
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    while True:
+        chunk = file.file.read(UPLOAD_READ_CHUNK)
+        if not chunk:
+            break
+        digest.update(chunk)
+        buffer += chunk
+    return bytes(buffer), digest.hexdigest()
+
+
+def storage_name(url: str):
+    """Object name inside the bucket for one of our public URLs."""
+    return unquote(os.path.basename(url.split("?")[0]))
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # This code runs ONCE when the server starts up
     print("[INFO] Server starting up...")
+    init_database()
 
     # --- ADD THIS ENTIRE BLOCK ---
     print("[INFO] Ensuring system 'automation_user' exists...")
@@ -71,16 +106,14 @@ async def lifespan(app: FastAPI):
         db.close() # Always close the database session
     # --- END OF BLOCK ---
 
-    print("[INFO] Loading ML models...")
-    tokenizer, model, nlp_model = load_all_models()
-    ml_models["tokenizer"] = tokenizer
-    ml_models["model"] = model
-    ml_models["nlp_model"] = nlp_model
-    print("[INFO] ML models loaded successfully and are ready.")
+    # Models load in the background; /health/ready reports when they are usable.
+    # Under `gunicorn --preload` (gunicorn.conf.py) they are already loaded in the master
+    # and shared with this worker. The summary query is only embedded by ingestion workers.
+    model_registry.warmup(API_MODELS)
+    print(f"[INFO] API started; models ready: {model_registry.is_ready(API_MODELS)}; memory: {memory_report()}")
 
     yield
 
-    ml_models.clear()
     print("[INFO] Server shutting down.")
 
 
@@ -118,10 +151,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- LOCAL UPLOAD DIRECTORY for temporary storage ---
-UPLOAD_DIRECTORY = "uploads"
-os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
-
 # --- Diagnostic Endpoints ---
 @app.get("/")
 def read_root():
@@ -138,6 +167,22 @@ def ping_db(db: Session = Depends(get_db)):
             detail=f"Database connection failed: {str(e)}"
         )
 
+@app.get("/health/live")
+def health_live():
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+def health_ready():
+    """200 once the API's models are loaded (503 before), with per-model load timings."""
+    ready = model_registry.is_ready(API_MODELS)
+    body = {"ready": ready, "models": model_registry.status(), "memory": memory_report()}
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
+@app.get("/metrics/cache")
+def cache_metrics():
+    """Hit rates and sizes of the OCR, embedding and highlighted PDF caches."""
+    return {**gen_ai1.cache_stats(), "ocr": ocr_cache_stats(), "highlight": highlight_cache_stats()}
+
 # --- User Management Endpoints ---
 @app.post("/users/", response_model=schemas.User)
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
@@ -155,7 +200,7 @@ def read_user(user_id: str, db: Session = Depends(get_db)):
 
 # --- Document Management Endpoints ---
 
-@app.post("/documents/upload")
+@app.post("/documents/upload", status_code=202)
 def upload_document(
         # Optional fields for email automation, but required for frontend
         title: Optional[str] = Form(None),
@@ -165,6 +210,11 @@ def upload_document(
         file: UploadFile = File(...),
         db: Session = Depends(get_db)
 ):
+    """
+    Accepts an upload and queues it for processing. Returns 202 straight away with the
+    job id; the OCR/ML pipeline, cloud uploads and DB updates run in the ingestion
+    workers (run_ingest_worker.py). Poll GET /jobs/{job_id} for progress.
+    """
     # --- 1. Set Default Values & Validate User ---
     # If a title wasn't provided (from email), create a default one.
     final_title = title or f"Email Attachment - {file.filename}"
@@ -180,87 +230,72 @@ def upload_document(
     if not user:
         raise HTTPException(status_code=404, detail=f"Uploader '{final_user_id}' not found")
 
-    # --- 2. Upload Original File to Cloud ---
-    print("Uploading original file to cloud storage...")
-    public_url = upload_file_to_supabase(file.file, file.filename)
-    if not public_url:
-        raise HTTPException(status_code=500, detail="Could not upload file to cloud storage.")
-    print("File uploaded successfully. Public URL:", public_url)
-
-    file.file.seek(0) # Rewind file for local processing
+    # --- 2. Reuse an Earlier Copy of the Same File ---
+    file_bytes, content_hash = read_upload(file)
+    document_data = schemas.DocumentCreate(title=final_title, department=final_department)
+    original = crud.get_processed_document_by_hash(db, content_hash)
+    if original is not None:
+        # file_path is unique, so a re-upload under an existing name is stored under a
+        # name prefixed with the new document's id (unique however often it is re-uploaded).
+        document_id = uuid.uuid4()
+        filename = file.filename
+        if crud.get_document_by_file_path(db, get_public_url(filename)):
+            filename = f"{document_id}_{filename}"
+        public_url = (copy_file_in_supabase(storage_name(original.file_path), filename)
+                      or upload_file_to_supabase(file_bytes, filename))
+        if not public_url:
+            raise HTTPException(status_code=502, detail="Could not store file in cloud storage.")
+        try:
+            db_document = crud.create_duplicate_document(db, original, document_data, file_path=public_url,
+                                                         user_id=final_user_id, document_id=document_id)
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=409, detail=f"A document stored as '{filename}' already exists.")
+        print(f"Duplicate of document {original.id}; reused its results for {db_document.id}")
+        if db_document.department and db_document.department != "Unknown":
+            crud.create_notification(
+                db=db,
+                document_id=db_document.id,
+                department=db_document.department,
+                message=f"New document '{db_document.title}' has been assigned to your department."
+            )
+        return {
+            "message": "Document already processed; results reused.",
+            "job_id": None,
+            "duplicate_of": original.id,
+            "document_info": schemas.Document.model_validate(db_document),
+        }
 
     # --- 3. Create Initial Database Record ---
-    # This now correctly matches the function in crud.py (which should not take highlighted_file_path)
-    document_data = schemas.DocumentCreate(title=final_title, department=final_department)
-    db_document = crud.create_document(db=db, document=document_data, file_path=public_url, user_id=final_user_id)
+    # The worker uploads the file under this name, so its public URL is known already.
+    public_url = get_public_url(file.filename)
+    try:
+        db_document = crud.create_document(db=db, document=document_data, file_path=public_url,
+                                           user_id=final_user_id, content_hash=content_hash)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"A document named '{file.filename}' already exists.")
     print(f"Initial document record created in DB with ID: {db_document.id}")
 
-    # --- 4. Save Local Copy & Run ML Pipeline ---
-    local_file_path = os.path.join(UPLOAD_DIRECTORY, file.filename)
-    with open(local_file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    print("Starting ML pipeline processing...")
-    ml_results = pipeline_process_pdf(
-        pdf_path=local_file_path,
-        clf_tokenizer=ml_models["tokenizer"],
-        clf_model=ml_models["model"],
-        nlp_model=ml_models["nlp_model"]
-    )
-    print("ML pipeline processing complete.")
-
-    # --- 5. Upload Highlighted PDF (if created) ---
-    highlighted_pdf_path = ml_results.get("highlighted_pdf")
-    highlighted_public_url = None
-    if highlighted_pdf_path and os.path.exists(highlighted_pdf_path):
-        print("Uploading highlighted file to cloud storage...")
-        with open(highlighted_pdf_path, "rb") as f:
-            highlighted_filename = os.path.basename(highlighted_pdf_path)
-            highlighted_public_url = upload_file_to_supabase(f, highlighted_filename)
-        print("Highlighted PDF uploaded successfully.")
-
-    # ... (after the ML pipeline runs) ...
-
-    # --- (6) UPDATE THE DATABASE RECORD WITH ML RESULTS ---
-    print("Updating database record with ML results...")
-    final_document = crud.update_document_with_ml_results(
-        db,
-        document_id=db_document.id,
-        ml_results=ml_results,
-        highlighted_file_path=highlighted_public_url
-    )
-    print("Database record updated successfully.")
-
-    # --- (7) CREATE NOTIFICATION FOR THE DEPARTMENT ---
-    # The ML results contain the department the document was routed to.
-    routed_department = final_document.department
-    if routed_department and routed_department != "Unknown":
-        notification_message = f"New document '{final_document.title}' has been assigned to your department."
-        crud.create_notification(
-            db=db,
-            document_id=final_document.id,
-            department=routed_department,
-            message=notification_message
-        )
-        print(f"Notification created for department: {routed_department}")
-
+    # --- 4. Queue the Ingestion Job ---
+    job = crud.create_ingestion_job(db, document_id=db_document.id, filename=file.filename, payload=file_bytes)
+    print(f"Ingestion job {job.id} queued for document {db_document.id}")
 
-    # --- 8. Cleanup Local Files ---
-    try:
-        if os.path.exists(local_file_path):
-            os.remove(local_file_path)
-        if highlighted_pdf_path and os.path.exists(highlighted_pdf_path):
-            os.remove(highlighted_pdf_path)
-    except OSError as e:
-        print(f"Error during file cleanup: {e}")
-
-    # --- 9. Return Final Response ---
     return {
-        "message": "Document processed and all data saved successfully.",
-        "document_info": schemas.Document.model_validate(final_document),
-        "highlighted_pdf_url": highlighted_public_url
+        "message": "Document accepted and queued for processing.",
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}",
+        "document_info": schemas.Document.model_validate(db_document),
     }
 
+@app.get("/jobs/{job_id}", response_model=schemas.IngestionJob)
+def read_ingestion_job(job_id: uuid.UUID, db: Session = Depends(get_db)):
+    """Status of an ingestion job, with per-stage progress and timings."""
+    job = crud.get_ingestion_job(db, job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 # --- Read Endpoints ---
 @app.get("/documents/", response_model=list[schemas.Document])
 def read_all_documents(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
@@ -272,6 +307,47 @@ def read_documents_for_department(department: str, skip: int = 0, limit: int = 1
     documents = crud.get_documents_by_department(db, department=department, skip=skip, limit=limit)
     return documents
 
+@app.get("/documents/{document_id}/highlights")
+def read_document_highlights(document_id: uuid.UUID, db: Session = Depends(get_db)):
+    """Highlight overlay (per-page rectangles in PDF points) for client-side rendering."""
+    db_document = crud.get_document_by_id(db, document_id=document_id)
+    if db_document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if db_document.highlight_overlay is None:
+        raise HTTPException(status_code=404, detail="No highlights for this document")
+    return db_document.highlight_overlay
+
+@app.get("/documents/{document_id}/highlighted.pdf")
+def read_highlighted_pdf(document_id: uuid.UUID, db: Session = Depends(get_db)):
+    """
+    The PDF with its highlights as annotations. Rendered from the stored overlay on the
+    first request, then served from the highlight cache.
+    """
+    db_document = crud.get_document_by_id(db, document_id=document_id)
+    if db_document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    overlay = db_document.highlight_overlay
+    if overlay is None:
+        # Documents ingested before overlays existed have a stored highlighted copy.
+        legacy_url = db_document.highlighted_file_path
+        if legacy_url and legacy_url != highlighted_pdf_url(document_id):
+            return RedirectResponse(legacy_url)
+        raise HTTPException(status_code=404, detail="No highlights for this document")
+
+    def render():
+        original = download_file_from_supabase(storage_name(db_document.file_path))
+        if original is None:
+            raise HTTPException(status_code=502, detail="Could not fetch the original document.")
+        return render_highlighted(original, overlay)
+
+    # Re-uploads share the content hash, so they share the rendered file too.
+    pdf_bytes = cached_highlighted_pdf(db_document.content_hash or str(db_document.id), overlay, render)
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="{document_id}_highlighted.pdf"'},
+    )
+
 # --- ADD THESE NEW ENDPOINTS FOR Q&A ---
 
 def run_ml_qna_in_background(question_id: uuid.UUID, pinecone_pdf_id: str, question_text: str):
@@ -326,7 +402,8 @@ def ask_question_on_document(
     print(f"New question saved with ID: {db_question.id}. Triggering background ML task.")
 
 
-    pinecone_pdf_id = os.path.splitext(os.path.basename(unquote(document.file_path)))[0]
+    # Re-uploads share the vectors of the copy that was actually processed.
+    pinecone_pdf_id = document.vector_namespace or os.path.splitext(storage_name(document.file_path))[0]
 
     background_tasks.add_task(
         run_ml_qna_in_background,
@@ -2,7 +2,7 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from gen_ai1 import query_pinecone_top_k
+from gen_ai1 import query_top_k
 
 llm = ChatGoogleGenerativeAI(
     model="gemini-2.5-flash",
@@ -11,7 +11,7 @@ llm = ChatGoogleGenerativeAI(
 )
 
 def qna(pdf_id,query):
-    docs = query_pinecone_top_k(str(pdf_id),10,query)
+    docs = query_top_k(str(pdf_id),10,query)
     if not docs:
         return "No relevant information found."
 
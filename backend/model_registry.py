@@ -0,0 +1,163 @@
+# backend/model_registry.py
+# Loads every ML model once, on first use or in a background warmup thread, instead of
+# at import time. Modules register a loader under a name; callers use get_model(name).
+#
+# Importing this module (or a module that only registers loaders) does no disk or
+# network work, so the API and worker processes start, and fork, cheaply.
+import gc
+import os
+import sys
+import threading
+import time
+
+
+class ModelRegistry:
+    """Named, lazily loaded models with per-model state and load timings."""
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._status = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        """`loader()` returns the model; it runs at most once (until it succeeds)."""
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            self._status.setdefault(name, {"state": "not_loaded"})
+
+    def get(self, name):
+        if name in self._models:
+            return self._models[name]
+        if name not in self._loaders:
+            raise KeyError(f"No model registered under '{name}'")
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited.
+            if name in self._models:
+                return self._models[name]
+            self._status[name] = {"state": "loading"}
+            print(f"[INFO] Loading model '{name}'...")
+            start = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                self._status[name] = {
+                    "state": "failed",
+                    "seconds": round(time.perf_counter() - start, 3),
+                    "error": str(e),
+                }
+                print(f"[ERROR] Loading model '{name}' failed: {e}")
+                raise
+            seconds = round(time.perf_counter() - start, 3)
+            self._models[name] = model
+            self._status[name] = {"state": "ready", "seconds": seconds}
+            print(f"[INFO] Model '{name}' ready in {seconds}s")
+            return model
+
+    def is_ready(self, names=None):
+        names = self._loaders.keys() if names is None else names
+        return all(name in self._models for name in names)
+
+    def status(self):
+        with self._lock:
+            return {name: dict(state) for name, state in self._status.items()}
+
+    def warmup(self, names=None, then=None, background=True):
+        """
+        Loads `names` (default: everything registered) and then calls `then()`.
+        With background=True this runs in a daemon thread, which is returned.
+        """
+        names = list(self._loaders) if names is None else list(names)
+
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except KeyError as e:
+                    print(f"[WARNING] Warmup skipped: {e}")
+                except Exception:
+                    pass  # recorded in status(); get() will retry on next use
+            if then is not None:
+                try:
+                    then()
+                except Exception as e:
+                    print(f"[WARNING] Warmup step failed: {e}")
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def prepare_for_fork(self):
+        """
+        Puts every loaded model in inference-only state (eval mode, no grad buffers) and
+        freezes the garbage collector, so forked workers keep sharing the model pages
+        copy-on-write instead of touching (and copying) them.
+        """
+        for model in self._models.values():
+            _inference_only(model)
+        gc.collect()
+        gc.freeze()
+        print(f"[INFO] Models prepared for fork: {sorted(self._models)} "
+              f"({gc.get_freeze_count()} objects frozen)")
+
+
+def _inference_only(obj, seen=None):
+    """eval() + requires_grad_(False) on every torch module inside `obj`."""
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+    if isinstance(obj, torch.nn.Module):
+        obj.eval()
+        obj.requires_grad_(False)
+        return
+    if isinstance(obj, (list, tuple)):
+        for item in obj:
+            _inference_only(item, seen)
+    elif isinstance(obj, dict):
+        for item in obj.values():
+            _inference_only(item, seen)
+    else:
+        # HF pipelines keep the module in .model, LangChain embeddings in ._client.
+        for attr in ("model", "_client", "client"):
+            inner = getattr(obj, attr, None)
+            if inner is not None:
+                _inference_only(inner, seen)
+
+
+def memory_report():
+    """This process's memory in MB: rss, and on Linux pss / shared / private."""
+    report = {"pid": os.getpid()}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line and not line.startswith(" "))
+        kb = lambda name: int(fields.get(name, "0 kB").split()[0])
+        report.update({
+            "rss_mb": round(kb("Rss") / 1024, 1),
+            "pss_mb": round(kb("Pss") / 1024, 1),
+            "shared_mb": round((kb("Shared_Clean") + kb("Shared_Dirty")) / 1024, 1),
+            "private_mb": round((kb("Private_Clean") + kb("Private_Dirty")) / 1024, 1),
+        })
+    except (OSError, ValueError):
+        import resource
+        report["rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return report
+
+
+registry = ModelRegistry()
+
+
+def register_model(name, loader):
+    registry.register(name, loader)
+
+
+def get_model(name):
+    return registry.get(name)
@@ -2,9 +2,9 @@
 import uuid
 import datetime
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, ARRAY, Boolean
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, ARRAY, Boolean, Integer, LargeBinary, JSON
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 
 Base = declarative_base()
@@ -34,6 +34,13 @@ class Document(Base):
     deadlines = Column(ARRAY(String), nullable=True)
     financial_terms = Column(ARRAY(String), nullable=True)
     highlighted_file_path = Column(String, nullable=True)
+    # Highlight rectangles per page (highlight.build_overlay); the highlighted PDF is
+    # rendered from these on first request instead of being stored.
+    highlight_overlay = Column(JSON, nullable=True)
+    # SHA-256 of the uploaded bytes; identical re-uploads reuse the processed results.
+    content_hash = Column(String(64), nullable=True, index=True)
+    # Vector store namespace holding this document's chunks (shared by duplicates).
+    vector_namespace = Column(String, nullable=True)
     uploader = relationship("User", back_populates="documents")
 
 
@@ -58,4 +65,26 @@ class Notification(Base):
     department = Column(String, nullable=False, index=True)
     message = Column(String, nullable=False)
     is_read = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id"), nullable=False, index=True)
+    filename = Column(String, nullable=False)
+    # The uploaded PDF itself; cleared once the job has finished. Deferred: status polls,
+    # progress writes and claims never load it, only run_job() reads it (once).
+    payload = deferred(Column(LargeBinary, nullable=True))
+    status = Column(String, default="queued", index=True)  # queued | running | completed | failed
+    stage = Column(String, nullable=True)
+    progress = Column(JSON, default=dict)  # stage -> {"status", "seconds"}
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    worker_id = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    document = relationship("Document")
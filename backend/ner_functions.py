@@ -1,113 +1,218 @@
 import spacy
 from spacy.matcher import PhraseMatcher
 import re
-from langdetect import detect, DetectorFactory
+from bisect import bisect_left, bisect_right
 from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
-
-# --- English spaCy model ---
-nlp_en = spacy.load("en_core_web_md")
+import onnx_backend
+import inference_client
+from model_registry import register_model, get_model
 
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# --- English spaCy model (loaded on first use, shared with pipeline.py) ---
+def load_spacy_en():
+    nlp = spacy.load("en_core_web_md")
+    get_extractor(nlp)  # keyword matcher is built with the model, not per page
+    return nlp
+
+
+register_model("spacy_en", load_spacy_en)
+
+
+def get_nlp_en():
+    return get_model("spacy_en")
+
+# Batched English NER (nlp.pipe). Only "ner" and a sentence splitter are read, so the
+# tagger / attribute_ruler / lemmatizer are never run.
+SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", "32"))
+SPACY_N_PROCESS = int(os.getenv("SPACY_N_PROCESS", "1"))
+# "parser" keeps the dependency-parse sentence boundaries used so far; "senter" uses the
+# much cheaper statistical sentence splitter (boundaries can differ slightly).
+SPACY_SENTENCES = os.getenv("SPACY_SENTENCES", "parser").lower()
+SPACY_UNUSED_COMPONENTS = ["tagger", "attribute_ruler", "lemmatizer"]
+
+
+def en_disabled_components(nlp):
+    """Components to skip for date/money extraction; enables the senter when selected."""
+    disabled = [name for name in SPACY_UNUSED_COMPONENTS if name in nlp.pipe_names]
+    if SPACY_SENTENCES == "senter" and "senter" in nlp.component_names:
+        if "senter" in nlp.disabled:
+            nlp.enable_pipe("senter")
+        if "parser" in nlp.pipe_names:
+            disabled.append("parser")
+    return disabled
+
 # 1. Define your token variable
 # Fetched from environment variables
 HF_TOKEN = os.getenv("HF_TOKEN")
 
 indic_model_name = "ai4bharat/IndicNER"
 
-# 2. Pass the token when loading the Tokenizer
-tokenizer = AutoTokenizer.from_pretrained(
-    indic_model_name, 
-    token=HF_TOKEN
-)
 
-# 3. Pass the token when loading the Model
-model = AutoModelForTokenClassification.from_pretrained(
-    indic_model_name, 
-    token=HF_TOKEN
-)
+def load_indic_ner():
+    """Returns (tokenizer, ner pipeline) for IndicNER."""
+    # 2. Pass the token when loading the Tokenizer
+    tokenizer = AutoTokenizer.from_pretrained(
+        indic_model_name,
+        token=HF_TOKEN
+    )
+
+    # 3. Pass the token when loading the Model
+    # With INFERENCE_BACKEND=onnx / onnx-int8 an exported ONNX graph is used instead.
+    model = None
+    if onnx_backend.onnx_enabled():
+        model = onnx_backend.load_onnx_model(
+            indic_model_name, "token-classification", tokenizer,
+            lambda: AutoModelForTokenClassification.from_pretrained(indic_model_name, token=HF_TOKEN),
+            token=HF_TOKEN,
+        )
+    if model is None:
+        model = AutoModelForTokenClassification.from_pretrained(
+            indic_model_name,
+            token=HF_TOKEN
+        )
+
+    # 4. The pipeline uses the loaded objects (no token needed here)
+    indic_ner = pipeline(
+        "ner",
+        model=model,
+        tokenizer=tokenizer,
+        aggregation_strategy="simple"
+    )
+    return tokenizer, indic_ner
+
+
+register_model("indic_ner", load_indic_ner)
+
+INDIC_BATCH_SIZE = int(os.getenv("INDIC_BATCH_SIZE", "8"))
+
+_DATETIME_RE = re.compile(r"\d{2}-\d{2}-\d{4} \d{2}:\d{2}:\d{2}")
+_DATE_RE = re.compile(r"\d{2}-\d{2}-\d{4}")
+_MONEY_RE = re.compile(r"(?:Rs\.?|₹)\s?\d{1,3}(?:,\d{3})*(?:\.\d+)?")
+
+DEADLINE_KEYWORDS = [
+    "deadline", "due", "by", "before", "expires", "submission", "submit by", "deadline",
+    "due date", "last date", "cut-off date", "closing date", "final date", "end date",
+    "last date for submission", "due for submission", "to be submitted by", "bid submission end date",
+    "tender submission date", "online submission deadline", "closing time for submission",
+    "application deadline", "application closing date", "last date for applying", "proposal due date",
+    "proposal submission deadline", "RFP submission date", "EOI submission date (Expression of Interest)",
+    "tender closing date", "bid closing date", "last date of receipt of bids", "last date of receipt of tenders",
+    "shall not be accepted after", "no application will be entertained after", "valid till", "to reach by",
+    "on or before", "time limit for submission", "period ends on", "Bid End Date/Time",
+    "അവസാന തീയതി", "അവസാന ദിവസം", "സമർപ്പിക്കേണ്ട അവസാന ദിവസം",
+    "സമർപ്പിക്കേണ്ട തീയതി", "അടയ്ക്കേണ്ട അവസാന ദിവസം",
+    "അപേക്ഷ സമർപ്പിക്കേണ്ട അവസാന തീയതി", "അപേക്ഷ അവസാന ദിവസം",
+    "പ്രമേയം സമർപ്പിക്കേണ്ട അവസാന ദിവസം"
+]
+# A date is a deadline when a keyword match starts within this many tokens of it.
+DEADLINE_KEYWORD_WINDOW = 10
+
+
+def _first_occurrence(text, value, known_start=None):
+    """
+    Offset of the first occurrence of `value` in `text` (what text.find returns).
+    With `known_start` (the offset of an entity/regex hit with that text) only the
+    text before it has to be searched.
+    """
+    if known_start is None:
+        return text.find(value)
+    return text.find(value, 0, known_start + len(value))
+
+
+class DeadlineExtractor:
+    """
+    Deadline and financial-sentence extraction for English text. The keyword matcher is
+    built once; each doc is matched once and dates are joined to nearby keyword matches
+    with a bisect over the sorted match starts, so a page costs O((dates + matches) log matches).
+    """
+
+    def __init__(self, nlp, keywords=DEADLINE_KEYWORDS, window=DEADLINE_KEYWORD_WINDOW):
+        self.nlp = nlp
+        self.window = window
+        self.matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+        # LOWER matching only needs the tokenizer, not the full pipeline.
+        self.matcher.add("DEADLINE_KEYWORD", [nlp.make_doc(keyword) for keyword in keywords])
+
+    def deadlines(self, dates, docs, text):
+        """
+        `dates` maps date strings to a known character offset (or None). Each date is
+        anchored at its first occurrence in the text, as before.
+        """
+        match_starts = sorted(start for _, start, _ in self.matcher(docs))
+        entity = set()
+        if not match_starts:
+            return []
+        for date_str, known_start in dates.items():
+            start_pos = _first_occurrence(text, date_str, known_start)
+            if start_pos == -1:
+                continue
+            span = docs.char_span(start_pos, start_pos + len(date_str))
+            if span is None:
+                continue
+            i = bisect_left(match_starts, span.start - self.window)
+            if i < len(match_starts) and match_starts[i] <= span.start + self.window:
+                entity.add(span.sent.text)
+        return list(entity)
+
+    def financials(self, amounts, docs, text):
+        entity = set()
+        for ent, known_start in amounts.items():
+            start_pos = _first_occurrence(text, ent, known_start)
+            if start_pos == -1:
+                continue
+            span = docs.char_span(start_pos, start_pos + len(ent))
+            entity.add(span.sent.text if span is not None else ent)
+        return list(entity)
+
+
+_extractors = {}
+
+
+def get_extractor(nlp):
+    """The DeadlineExtractor for a spaCy pipeline, built on first use."""
+    extractor = _extractors.get(id(nlp))
+    if extractor is None or extractor.nlp is not nlp:
+        extractor = _extractors[id(nlp)] = DeadlineExtractor(nlp)
+    return extractor
 
-# 4. The pipeline uses the loaded objects (no token needed here)
-indic_ner = pipeline(
-    "ner", 
-    model=model, 
-    tokenizer=tokenizer, 
-    aggregation_strategy="simple"
-)
-# Consistent language detection
-DetectorFactory.seed = 0
 
 def get_deadline(dates, docs, text, nlp):
-    deadline_keywords = [
-        "deadline", "due", "by", "before", "expires", "submission", "submit by", "deadline",
-        "due date", "last date", "cut-off date", "closing date", "final date", "end date",
-        "last date for submission", "due for submission", "to be submitted by", "bid submission end date",
-        "tender submission date", "online submission deadline", "closing time for submission",
-        "application deadline", "application closing date", "last date for applying", "proposal due date",
-        "proposal submission deadline", "RFP submission date", "EOI submission date (Expression of Interest)",
-        "tender closing date", "bid closing date", "last date of receipt of bids", "last date of receipt of tenders",
-        "shall not be accepted after", "no application will be entertained after", "valid till", "to reach by",
-        "on or before", "time limit for submission", "period ends on", "Bid End Date/Time",
-        "അവസാന തീയതി", "അവസാന ദിവസം", "സമർപ്പിക്കേണ്ട അവസാന ദിവസം",
-        "സമർപ്പിക്കേണ്ട തീയതി", "അടയ്ക്കേണ്ട അവസാന ദിവസം",
-        "അപേക്ഷ സമർപ്പിക്കേണ്ട അവസാന തീയതി", "അപേക്ഷ അവസാന ദിവസം",
-        "പ്രമേയം സമർപ്പിക്കേണ്ട അവസാന ദിവസം"
-    ]
+    return get_extractor(nlp).deadlines(dict.fromkeys(dates), docs, text)
 
-    matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
-    pattern = [nlp(keyword) for keyword in deadline_keywords]
-    matcher.add("DEADLINE_KEYWORD", pattern)
-    entity = []
 
-    for date_str in dates:
-        start_pos = text.find(date_str)
-        if start_pos == -1:
-            # date string not found, skip
-            continue
-        end_pos = start_pos + len(date_str)
-        span = docs.char_span(start_pos, end_pos)
-        if span is None:
-            continue
-        sentence = span.sent
-        date_start = span.start
+def get_financial_details(entities, docs, text, nlp):
+    return get_extractor(nlp).financials(dict.fromkeys(entities), docs, text)
 
-        for match_id, start, end in matcher(docs):
-            if abs(start - date_start) <= 10:
-                entity.append(sentence.text)
-    return list(set(entity))
 
-def get_financial_details(entities, docs, text, nlp):
-    entity = []
-    for ent in entities:
-        start_pos = text.find(ent)
-        if start_pos == -1:
-            continue
-        end_pos = start_pos + len(ent)
-        span = docs.char_span(start_pos, end_pos)
-        if span is not None:
-            entity.append(span.sent.text)
-        else:
-            entity.append(ent)
-    return list(set(entity))
+def _add_hit(hits, value, start):
+    if value not in hits or hits[value] > start:
+        hits[value] = start
 
-def ner_extraction_en(text, nlp):
-    docs = nlp(text)
-    spacy_dates = [ent.text for ent in docs.ents if ent.label_ == 'DATE']
-    spacy_money = [ent.text for ent in docs.ents if ent.label_ == 'MONEY']
 
-    # Regex for dates and money
-    regex_dates = re.findall(r"\d{2}-\d{2}-\d{4} \d{2}:\d{2}:\d{2}", text)
-    simple_regex_dates = re.findall(r"\d{2}-\d{2}-\d{4}", text)
-    regex_money = re.findall(r"(?:Rs\.?|₹)\s?\d{1,3}(?:,\d{3})*(?:\.\d+)?", text)
+def _extract_en_from_doc(docs, text, nlp):
+    # value -> offset of its earliest hit, used to bound the first-occurrence search.
+    dates, amounts = {}, {}
+    for ent in docs.ents:
+        if ent.label_ == 'DATE':
+            _add_hit(dates, ent.text, ent.start_char)
+        elif ent.label_ == 'MONEY':
+            _add_hit(amounts, ent.text, ent.start_char)
 
-    all_dates = set(spacy_dates + regex_dates + simple_regex_dates)
-    all_money = set(spacy_money + regex_money)
+    # Regex for dates and money
+    for m in _DATETIME_RE.finditer(text):
+        _add_hit(dates, m.group(0), m.start())
+    for m in _DATE_RE.finditer(text):
+        _add_hit(dates, m.group(0), m.start())
+    for m in _MONEY_RE.finditer(text):
+        _add_hit(amounts, m.group(0), m.start())
 
-    deadlines = get_deadline(all_dates, docs, text, nlp)
-    money = get_financial_details(all_money, docs, text, nlp)
+    extractor = get_extractor(nlp)
+    deadlines = extractor.deadlines(dates, docs, text)
+    money = extractor.financials(amounts, docs, text)
 
     return {
         "deadlines": deadlines,
@@ -115,69 +220,237 @@ def ner_extraction_en(text, nlp):
     }
 
 
+def ner_extraction_en(text, nlp):
+    return ner_extraction_en_batch([text], nlp, n_process=1)[0]
+
+
+def ner_extraction_en_batch(texts, nlp=None, batch_size=None, n_process=None):
+    """
+    English date/money extraction for many texts (a document's pages, or many documents
+    in a backfill) with one nlp.pipe() pass over the trimmed pipeline.
+    """
+    nlp = nlp or get_nlp_en()
+    texts = list(texts)
+    docs_iter = nlp.pipe(
+        texts,
+        batch_size=batch_size or SPACY_BATCH_SIZE,
+        n_process=n_process or SPACY_N_PROCESS,
+        disable=en_disabled_components(nlp),
+    )
+    return [_extract_en_from_doc(docs, text, nlp) for text, docs in zip(texts, docs_iter)]
+
+
 def split_sentences_ml(text):
     # Split using Malayalam and English sentence delimiters
     return re.split(r'(?<=[.?!।])\s+', text)
 
-def ner_extraction_ml(text):
-    results = indic_ner(text)
-    deadlines, financials = [], []
 
-    sentences = split_sentences_ml(text)
+_SENTENCE_BREAK_ML = re.compile(r'(?<=[.?!।])\s+')
 
-    def find_sentence(word):
-        for sent in sentences:
-            if word in sent:
-                return sent.strip()
-        return word
+MONTHS_WEEKDAYS_ML = [
+    "ജനുവരി","ഫെബ്രുവരി","മാർച്ച്","ഏപ്രിൽ","മേയ്","ജൂൺ",
+    "ജൂലൈ","ഓഗസ്റ്റ്","സെപ്റ്റംബർ","ഒക്ടോബർ","നവംബർ","ഡിസംബർ",
+    "ഞായറാഴ്ച","തിങ്കളാഴ്ച","ചൊവ്വാഴ്ച","ബുധനാഴ്ച",
+    "വ്യാഴാഴ്ച","വെള്ളിയാഴ്ച","ശനിയാഴ്ച"
+]
+# Money and (month/weekday + day number) dates in one pass.
+_ML_PATTERNS = re.compile(
+    r"(?P<money>(?:₹|രൂപ)\s?\d{1,3}(?:,\d{3})*(?:\.\d+)?)"
+    r"|(?P<date>(?:" + "|".join(sorted(map(re.escape, MONTHS_WEEKDAYS_ML), key=len, reverse=True)) + r")\s?\d{1,2})"
+)
 
-    # --- Model-based entities ---
-    for r in results:
-        entity_grp = r.get("entity_group")
-        word = r.get("word")
-        if entity_grp in ["DATE", "TIME"]:
-            deadlines.append(find_sentence(word))
-        elif entity_grp in ["MONEY", "CURRENCY"]:
-            financials.append(find_sentence(word))
-
-    # --- Regex-based money ---
-    regex_money_ml = re.findall(r"(?:₹|രൂപ)\s?\d{1,3}(?:,\d{3})*(?:\.\d+)?", text)
-    for m in regex_money_ml:
-        financials.append(find_sentence(m))
-
-    # --- Regex-based dates (months + weekdays + day number) ---
-    keywords_ml = [
-        "ജനുവരി","ഫെബ്രുവരി","മാർച്ച്","ഏപ്രിൽ","മേയ്","ജൂൺ",
-        "ജൂലൈ","ഓഗസ്റ്റ്","സെപ്റ്റംബർ","ഒക്ടോബർ","നവംബർ","ഡിസംബർ",
-        "ഞായറാഴ്ച","തിങ്കളാഴ്ച","ചൊവ്വാഴ്ച","ബുധനാഴ്ച",
-        "വ്യാഴാഴ്ച","വെള്ളിയാഴ്ച","ശനിയാഴ്ച"
+# IndicNER sees sentence-aligned windows of at most this many tokens (model limit 512).
+INDIC_WINDOW_TOKENS = int(os.getenv("INDIC_WINDOW_TOKENS", "256"))
+
+
+class SentenceIndex:
+    """Sentence spans of a text; maps a character offset to its sentence with bisect."""
+
+    def __init__(self, text):
+        self.text = text
+        self.starts, self.ends = [], []
+        pos = 0
+        for m in _SENTENCE_BREAK_ML.finditer(text):
+            self.starts.append(pos)
+            self.ends.append(m.start())
+            pos = m.end()
+        self.starts.append(pos)
+        self.ends.append(len(text))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def sentence_at(self, offset):
+        i = max(bisect_right(self.starts, offset) - 1, 0)
+        return self.text[self.starts[i]:self.ends[i]].strip()
+
+
+def _ml_windows(index):
+    """
+    Packs consecutive sentences into windows of <= INDIC_WINDOW_TOKENS tokens; a longer
+    sentence is cut at token boundaries. Returns [(char_start, char_end), ...].
+    """
+    text = index.text
+    sentences = [text[s:e] for s, e in zip(index.starts, index.ends)]
+    tokenizer, _ = get_model("indic_ner")
+    encodings = tokenizer(sentences, add_special_tokens=False, return_offsets_mapping=True)
+    windows = []
+    win_start, win_end, win_tokens = None, None, 0
+    for start, end, offsets in zip(index.starts, index.ends, encodings["offset_mapping"]):
+        n_tokens = len(offsets)
+        if n_tokens > INDIC_WINDOW_TOKENS:
+            if win_start is not None:
+                windows.append((win_start, win_end))
+                win_start, win_tokens = None, 0
+            for i in range(0, n_tokens, INDIC_WINDOW_TOKENS):
+                piece = offsets[i:i + INDIC_WINDOW_TOKENS]
+                windows.append((start + piece[0][0], start + piece[-1][1]))
+            continue
+        if win_start is not None and win_tokens + n_tokens > INDIC_WINDOW_TOKENS:
+            windows.append((win_start, win_end))
+            win_start, win_tokens = None, 0
+        if win_start is None:
+            win_start = start
+        win_end = end
+        win_tokens += n_tokens
+    if win_start is not None:
+        windows.append((win_start, win_end))
+    return [(s, e) for s, e in windows if text[s:e].strip()]
+
+
+def ner_extraction_ml(text):
+    return ner_extraction_ml_batch([text])[0]
+
+
+def ner_extraction_ml_batch(texts):
+    """
+    Malayalam NER for many texts: every text is cut into sentence windows, all windows
+    go through IndicNER in batches, and each entity is mapped back to its sentence by
+    offset. Regex money/date hits are added the same way.
+    """
+    texts = list(texts)
+    indexes = [SentenceIndex(text) for text in texts]
+    windows = []  # (text index, char_start, char_end)
+    for i, index in enumerate(indexes):
+        windows.extend((i, start, end) for start, end in _ml_windows(index))
+
+    deadlines = [set() for _ in texts]
+    financials = [set() for _ in texts]
+
+    if windows:
+        window_texts = [texts[i][start:end] for i, start, end in windows]
+        _, indic_ner = get_model("indic_ner")
+        all_results = indic_ner(window_texts, batch_size=INDIC_BATCH_SIZE)
+        # --- Model-based entities ---
+        for (i, start, _), window_text, results in zip(windows, window_texts, all_results):
+            for r in results:
+                entity_grp = r.get("entity_group")
+                if entity_grp in ["DATE", "TIME"]:
+                    target = deadlines[i]
+                elif entity_grp in ["MONEY", "CURRENCY"]:
+                    target = financials[i]
+                else:
+                    continue
+                offset = r.get("start")
+                if offset is None:
+                    offset = window_text.find(r.get("word", ""))
+                    if offset == -1:
+                        target.add(r.get("word"))
+                        continue
+                target.add(indexes[i].sentence_at(start + offset))
+
+    # --- Regex-based money and dates (months + weekdays + day number) ---
+    for i, text in enumerate(texts):
+        for m in _ML_PATTERNS.finditer(text):
+            target = financials[i] if m.lastgroup == "money" else deadlines[i]
+            target.add(indexes[i].sentence_at(m.start()))
+
+    return [
+        {"deadlines": list(d), "financials": list(f)}
+        for d, f in zip(deadlines, financials)
     ]
 
-    for key in keywords_ml:
-        matches = re.findall(rf"{key}\s?\d{{1,2}}", text)
-        for m in matches:
-            deadlines.append(find_sentence(m))
 
-    return {
-        "deadlines": list(set(deadlines)),
-        "financials": list(set(financials))
-    }
+# --- Script-based language routing (replaces langdetect) ---
+_MALAYALAM_CHARS = re.compile(r"[\u0D00-\u0D7F]")
+# Other Indic scripts (Devanagari ... Kannada); IndicNER covers these as well.
+_INDIC_CHARS = re.compile(r"[\u0900-\u0CFF]")
+_LATIN_CHARS = re.compile(r"[A-Za-z\u00C0-\u024F]")
+_SEGMENT_SPLIT = re.compile(r"(?<=[.?!।:;])\s+|\s*\n+\s*")
+
+
+def segment_script(segment):
+    """'ml' (Malayalam / other Indic), 'en' (Latin), or None when it has no letters."""
+    indic = len(_MALAYALAM_CHARS.findall(segment)) + len(_INDIC_CHARS.findall(segment))
+    latin = len(_LATIN_CHARS.findall(segment))
+    if not indic and not latin:
+        return None
+    return "ml" if indic >= latin else "en"
+
+
+def route_by_script(text):
+    """
+    Splits a page into runs of consecutive sentences in the same script and returns
+    [(lang, run_text), ...] with lang "en" or "ml". Segments without letters (numbers,
+    dates, amounts) stay with the run they appear in; a text with no letters at all is
+    one "en" run, so its dates and amounts still reach the regex extractors.
+    """
+    runs = []
+    pending = []  # letterless segments before the first run
+    for segment in _SEGMENT_SPLIT.split(text):
+        if not segment:
+            continue
+        lang = segment_script(segment)
+        if lang is None:
+            if runs:
+                runs[-1][1].append(segment)
+            else:
+                pending.append(segment)
+            continue
+        if runs and runs[-1][0] == lang:
+            runs[-1][1].append(segment)
+        else:
+            runs.append((lang, pending + [segment]))
+            pending = []
+    if pending:
+        runs.append(("en", pending))
+    return [(lang, " ".join(parts)) for lang, parts in runs]
 
 
+def _merge_results(results):
+    deadlines, financials = set(), set()
+    for r in results:
+        deadlines.update(r["deadlines"])
+        financials.update(r["financials"])
+    return {"deadlines": list(deadlines), "financials": list(financials)}
+
 
 def ner_extraction_multilingual(text):
-    try:
-        lang = detect(text)
-    except:
-        lang = "en"
-
-    if lang == "en":
-        return ner_extraction_en(text, nlp_en)
-    elif lang == "ml":
-        return ner_extraction_ml(text)
-    else:
-        # Unsupported language - return empty results
-        return {"deadlines": [], "financials": []}
+    return ner_extraction_multilingual_batch([text])[0]
+
+
+def ner_extraction_multilingual_batch(texts, batch_size=None, n_process=None):
+    """
+    Routes every sentence run of every text by script: English runs go through spaCy in
+    one batched nlp.pipe pass, Malayalam runs through IndicNER in batches. Results are
+    merged back per text, so mixed-language pages keep the entities of both languages.
+    """
+    texts = list(texts)
+    if inference_client.enabled():
+        return inference_client.ner(texts)
+    english, malayalam = [], []  # (text index, run text)
+    for i, text in enumerate(texts):
+        for lang, run in route_by_script(text):
+            (english if lang == "en" else malayalam).append((i, run))
+
+    per_text = [[] for _ in texts]
+    en_results = ner_extraction_en_batch([run for _, run in english], get_nlp_en(),
+                                         batch_size=batch_size, n_process=n_process) if english else []
+    for (i, _), result in zip(english, en_results):
+        per_text[i].append(result)
+    for (i, _), result in zip(malayalam, ner_extraction_ml_batch([run for _, run in malayalam])):
+        per_text[i].append(result)
+    return [_merge_results(results) for results in per_text]
 
 # Example test
 if __name__ == "_main_":
@@ -0,0 +1,56 @@
+# backend/ocr_cache.py
+# Content-addressed cache of OCR results. Logos, seals and signature blocks are the
+# same image bytes on every page and in every document, so they are OCR'd only once.
+import hashlib
+import json
+import os
+
+from disk_cache import DiskLRUCache
+
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", os.path.join("cache", "ocr_cache.sqlite3"))
+OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", "256"))
+# Bump when the preprocessing or OCR call changes so stale results are never served.
+OCR_CACHE_VERSION = "2"
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = DiskLRUCache(OCR_CACHE_PATH, OCR_CACHE_MAX_MB * 1024 * 1024, name="ocr")
+    return _cache
+
+
+def ocr_cache_key(image_bytes, preprocess, lang):
+    """sha256 of the image bytes plus everything that changes the OCR output."""
+    digest = hashlib.sha256(image_bytes)
+    digest.update(f"|{preprocess}|{lang}|v{OCR_CACHE_VERSION}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def cached_ocr(image_bytes, preprocess, lang, run_ocr):
+    """
+    Returns the OCR result for `image_bytes` ({"text": ..., "words": [...]}, stored as
+    JSON), calling `run_ocr()` only on a cache miss. Failures of the cache itself
+    never fail the OCR.
+    """
+    key = ocr_cache_key(image_bytes, preprocess, lang)
+    try:
+        cached = get_cache().get(key)
+    except Exception as e:
+        print(f"[WARNING] OCR cache read failed: {e}")
+        cached = None
+    if cached is not None:
+        return json.loads(cached.decode("utf-8"))
+
+    result = run_ocr()
+    try:
+        get_cache().set(key, json.dumps(result, ensure_ascii=False).encode("utf-8"))
+    except Exception as e:
+        print(f"[WARNING] OCR cache write failed: {e}")
+    return result
+
+
+def ocr_cache_stats():
+    return get_cache().stats()
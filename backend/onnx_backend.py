@@ -0,0 +1,209 @@
+# backend/onnx_backend.py
+# Optional ONNX Runtime inference for the department classifier and IndicNER.
+#
+# INFERENCE_BACKEND selects the runtime:
+#   torch      -- eager PyTorch (default, previous behaviour)
+#   onnx       -- fp32 ONNX graph run by onnxruntime
+#   onnx-int8  -- ONNX graph with dynamic int8 quantization of the weights
+#
+# Exported graphs are cached under ONNX_CACHE_DIR, one directory per model revision, so
+# a new upstream checkpoint is re-exported instead of reusing a stale graph. Every export is checked against the
+# PyTorch outputs; if parity fails the caller falls back to PyTorch.
+import json
+import os
+import time
+
+import numpy as np
+import torch
+from transformers import AutoConfig
+from transformers.modeling_outputs import SequenceClassifierOutput, TokenClassifierOutput
+
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", os.path.join("models", "onnx"))
+ONNX_OPSET = 17
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0 = let onnxruntime decide
+# Share of predictions (rows for classification, tokens for NER) that must agree with PyTorch.
+PARITY_MIN_AGREEMENT = float(os.getenv("ONNX_PARITY_MIN_AGREEMENT", "0.98"))
+
+PARITY_SAMPLES = [
+    "The last date for submission of bids is 20-10-2025 15:00. EMD of Rs. 50,000 must be paid online.",
+    "Maintenance of escalators at Aluva and Edappally stations is scheduled for next week.",
+    "All employees must complete the fire safety training before 30 November 2025.",
+    "പണം അടയ്ക്കേണ്ട അവസാന തീയതി നവംബർ 5 ആണ്. ₹1000 നൽകണം.",
+    "കൊച്ചി മെട്രോ റെയിൽ ലിമിറ്റഡ് പുതിയ സുരക്ഷാ നിർദ്ദേശങ്ങൾ പുറത്തിറക്കി.",
+]
+
+_OUTPUT_TYPES = {
+    "sequence-classification": SequenceClassifierOutput,
+    "token-classification": TokenClassifierOutput,
+}
+
+
+def onnx_enabled():
+    return INFERENCE_BACKEND in ("onnx", "onnx-int8")
+
+
+class OnnxModel(torch.nn.Module):
+    """
+    Drop-in stand-in for a Hugging Face *ForSequenceClassification / *ForTokenClassification
+    model backed by an onnxruntime session. Accepts the same keyword inputs and returns
+    the same output type, so batching code and `transformers.pipeline` work unchanged.
+    """
+
+    def __init__(self, session, config, task):
+        super().__init__()
+        self.session = session
+        self.config = config
+        self.task = task
+        self.input_names = [i.name for i in session.get_inputs()]
+        self.dtype = torch.float32
+
+    @property
+    def device(self):
+        return torch.device("cpu")
+
+    def can_generate(self):
+        return False
+
+    def to(self, *args, **kwargs):
+        return self
+
+    def forward(self, input_ids=None, attention_mask=None, **kwargs):
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask, **kwargs}
+        ort_inputs = {
+            name: feed[name].cpu().numpy().astype(np.int64)
+            for name in self.input_names if feed.get(name) is not None
+        }
+        logits = self.session.run(["logits"], ort_inputs)[0]
+        return _OUTPUT_TYPES[self.task](logits=torch.from_numpy(logits))
+
+
+def _model_dir(model_name, revision):
+    return os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "__"), revision or "local")
+
+
+def _tmp_path(path):
+    """Sibling temp name for `path`; files are renamed into place once fully written."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{os.getpid()}.tmp{ext}"
+
+
+def export_to_onnx(torch_model, tokenizer, path):
+    """Exports a HF classification model with dynamic batch and sequence axes."""
+    torch_model.eval()
+    sample = tokenizer(PARITY_SAMPLES[:2], padding=True, return_tensors="pt")
+    dynamic = {0: "batch", 1: "sequence"}
+    tmp_path = _tmp_path(path)
+    with torch.no_grad():
+        # dynamo=False: the TorchScript exporter, which does not need onnxscript.
+        torch.onnx.export(
+            torch_model,
+            (sample["input_ids"], sample["attention_mask"]),
+            tmp_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={"input_ids": dynamic, "attention_mask": dynamic, "logits": {0: "batch"}},
+            opset_version=ONNX_OPSET,
+            dynamo=False,
+        )
+    os.replace(tmp_path, path)
+
+
+def quantize_int8(fp32_path, int8_path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    tmp_path = _tmp_path(int8_path)
+    quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, int8_path)
+
+
+def create_session(path):
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if ONNX_THREADS:
+        options.intra_op_num_threads = ONNX_THREADS
+    return ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def check_parity(torch_model, onnx_model, tokenizer, samples=PARITY_SAMPLES):
+    """
+    Runs the same inputs through both models and compares the logits.
+    Returns {"agreement": ..., "max_abs_diff": ..., "passed": bool}.
+    """
+    inputs = tokenizer(samples, padding=True, truncation=True, max_length=256, return_tensors="pt")
+    torch_model.eval()
+    with torch.inference_mode():
+        expected = torch_model(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"]).logits.float()
+    actual = onnx_model(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"]).logits.float()
+
+    agree = expected.argmax(dim=-1) == actual.argmax(dim=-1)
+    if expected.dim() == 3:
+        # Token classification: only compare real (non-padding) tokens.
+        agree = agree[inputs["attention_mask"].bool()]
+    agreement = agree.float().mean().item()
+    return {
+        "agreement": round(agreement, 4),
+        "max_abs_diff": round((expected - actual).abs().max().item(), 5),
+        "passed": agreement >= PARITY_MIN_AGREEMENT,
+    }
+
+
+def load_onnx_model(model_name, task, tokenizer, load_torch_model, quantize=None, token=None):
+    """
+    Returns an OnnxModel for `model_name`, exporting (and quantizing) it on first use,
+    or None when the graph failed its parity check / could not be built.
+
+    `load_torch_model` is only called when an export is needed, so warm starts never
+    load the PyTorch weights.
+    """
+    quantize = INFERENCE_BACKEND == "onnx-int8" if quantize is None else quantize
+    try:
+        config = AutoConfig.from_pretrained(model_name, token=token)
+    except Exception as e:
+        print(f"[WARNING] ONNX backend unavailable for {model_name}: could not load config "
+              f"({type(e).__name__}: {e}). Using PyTorch.")
+        return None
+    # Hub snapshot hash; local checkpoints have none and share one directory.
+    model_dir = _model_dir(model_name, getattr(config, "_commit_hash", None))
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    graph_path = os.path.join(model_dir, "model.int8.onnx" if quantize else "model.onnx")
+    parity_path = graph_path + ".parity.json"
+
+    try:
+        if not os.path.exists(parity_path):
+            os.makedirs(model_dir, exist_ok=True)
+            start = time.time()
+            torch_model = load_torch_model()
+            if not os.path.exists(fp32_path):
+                print(f"[INFO] Exporting {model_name} to ONNX...")
+                export_to_onnx(torch_model, tokenizer, fp32_path)
+            if quantize and not os.path.exists(graph_path):
+                print(f"[INFO] Quantizing {model_name} to int8...")
+                quantize_int8(fp32_path, graph_path)
+            onnx_model = OnnxModel(create_session(graph_path), torch_model.config, task)
+            parity = check_parity(torch_model, onnx_model, tokenizer)
+            parity["export_seconds"] = round(time.time() - start, 2)
+            tmp_path = _tmp_path(parity_path)
+            with open(tmp_path, "w") as f:
+                json.dump(parity, f)
+            os.replace(tmp_path, parity_path)
+            print(f"[INFO] ONNX parity for {model_name}: {parity}")
+            del torch_model
+        else:
+            with open(parity_path) as f:
+                parity = json.load(f)
+            onnx_model = None
+
+        if not parity["passed"]:
+            print(f"[WARNING] ONNX graph for {model_name} failed parity check "
+                  f"(agreement {parity['agreement']} < {PARITY_MIN_AGREEMENT}); using PyTorch.")
+            return None
+        if onnx_model is None:
+            onnx_model = OnnxModel(create_session(graph_path), config, task)
+        print(f"[INFO] Using ONNX Runtime ({'int8' if quantize else 'fp32'}) for {model_name}")
+        return onnx_model
+    except Exception as e:
+        print(f"[WARNING] ONNX backend unavailable for {model_name}: {type(e).__name__}: {e}. Using PyTorch.")
+        return None
@@ -0,0 +1,128 @@
+# backend/page_artifacts.py
+# Per-page pipeline artifacts (extracted text, OCR decisions, NER hits, chunks), stored
+# zstd-compressed under a hash of the page's content. A revised document or a re-run
+# after a model change only recomputes the pages/stages that actually changed.
+#
+# Keys are "<stage>|<stage version>|<page hash>"; a stage's version string names
+# everything its output depends on (models, parameters, upstream stage versions).
+# Embeddings are not stored here: the embedding cache already keys them by model id
+# and chunk text.
+import hashlib
+import json
+import os
+
+import pymupdf
+import zstandard
+
+from disk_cache import DiskLRUCache
+from extraction import open_pdf
+
+PAGE_ARTIFACTS_ENABLED = os.getenv("PAGE_ARTIFACTS", "1") == "1"
+PAGE_ARTIFACTS_PATH = os.getenv("PAGE_ARTIFACTS_PATH", os.path.join("cache", "page_artifacts.sqlite3"))
+PAGE_ARTIFACTS_MAX_MB = int(os.getenv("PAGE_ARTIFACTS_MAX_MB", "2048"))
+PAGE_ARTIFACTS_ZSTD_LEVEL = int(os.getenv("PAGE_ARTIFACTS_ZSTD_LEVEL", "3"))
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = DiskLRUCache(PAGE_ARTIFACTS_PATH, PAGE_ARTIFACTS_MAX_MB * 1024 * 1024, name="page_artifacts")
+    return _store
+
+
+def _font_digest(doc, font):
+    """
+    Digest of what decides a font's extracted text: the embedded font program, the
+    encoding and the ToUnicode map (by content, not name or xref number).
+    """
+    xref, ext, _, _, _, encoding = font[:6]
+    digest = hashlib.sha256(f"{ext}|{encoding}|".encode("utf-8"))
+    try:
+        program = doc.extract_font(xref)[3]
+        # Composite/Type3 fonts have no single program; fall back to the font object.
+        digest.update(program or doc.xref_object(xref, compressed=True).encode("utf-8"))
+        kind, value = doc.xref_get_key(xref, "ToUnicode")
+        if kind == "xref":
+            digest.update(b"|tounicode|")
+            digest.update(doc.xref_stream_raw(int(value.split()[0])) or b"")
+        kind, value = doc.xref_get_key(xref, "Encoding")
+        if kind == "xref":
+            value = doc.xref_object(int(value.split()[0]), compressed=True)
+        digest.update(f"|encoding:{value}".encode("utf-8"))
+    except Exception:
+        digest.update(f"|xref:{xref}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def page_content_hash(page, doc, stream_digests=None):
+    """
+    Hash of what a page draws: geometry, content stream, fonts (embedded program and
+    encoding), and the raw streams of its images and form XObjects. `stream_digests`
+    memoizes streams shared by pages.
+    """
+    if stream_digests is None:
+        stream_digests = {}
+    digest = hashlib.sha256()
+    digest.update(f"{tuple(page.rect)}|{page.rotation}|".encode("utf-8"))
+    digest.update(page.read_contents())
+    for font in page.get_fonts(full=True):
+        key = ("font", font[0])
+        if key not in stream_digests:
+            stream_digests[key] = _font_digest(doc, font)
+        digest.update(f"|font:{font[3]}:{stream_digests[key]}".encode("utf-8"))
+    xrefs = [img[0] for img in page.get_images(full=True)] + [x[0] for x in page.get_xobjects()]
+    for xref in xrefs:
+        if xref not in stream_digests:
+            try:
+                stream_digests[xref] = hashlib.sha256(doc.xref_stream_raw(xref) or b"").hexdigest()
+            except Exception:
+                stream_digests[xref] = str(xref)
+        digest.update(f"|xobj:{stream_digests[xref]}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def page_hashes(pdf_source):
+    """Content hashes of every page, in page order. An open document is left open."""
+    owned = not isinstance(pdf_source, pymupdf.Document)
+    doc = open_pdf(pdf_source) if owned else pdf_source
+    try:
+        stream_digests = {}
+        return [page_content_hash(page, doc, stream_digests) for page in doc]
+    finally:
+        if owned:
+            doc.close()
+
+
+def _key(stage, version, page_hash):
+    return f"{stage}|{version}|{page_hash}"
+
+
+def load_artifact(stage, version, page_hash):
+    """Returns the stored artifact (JSON value) or None."""
+    if not PAGE_ARTIFACTS_ENABLED:
+        return None
+    try:
+        blob = get_store().get(_key(stage, version, page_hash))
+        if blob is None:
+            return None
+        return json.loads(zstandard.ZstdDecompressor().decompress(blob))
+    except Exception as e:
+        print(f"[WARNING] Page artifact read failed: {e}")
+        return None
+
+
+def save_artifact(stage, version, page_hash, value):
+    if not PAGE_ARTIFACTS_ENABLED:
+        return
+    try:
+        raw = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        blob = zstandard.ZstdCompressor(level=PAGE_ARTIFACTS_ZSTD_LEVEL).compress(raw)
+        get_store().set(_key(stage, version, page_hash), blob)
+    except Exception as e:
+        print(f"[WARNING] Page artifact write failed: {e}")
+
+
+def page_artifact_stats():
+    return get_store().stats()
@@ -2,23 +2,49 @@ import regex as re
 import unicodedata
 from collections import Counter
 from pathlib import Path
-import io
 import argparse
 import os
-import pymupdf
-from PIL import Image, ImageOps, ImageFilter
-import pytesseract
-import spacy
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import torch
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from pytesseract import Output
-from ner_functions import ner_extraction_multilingual, get_deadline, get_financial_details
+from ner_functions import (ner_extraction_multilingual, ner_extraction_multilingual_batch, get_deadline,
+                           get_financial_details, get_nlp_en, SPACY_SENTENCES)
+from model_registry import register_model, get_model
+from extraction import extract_pages, extraction_version, open_pdf
+from page_artifacts import PAGE_ARTIFACTS_ENABLED, page_hashes, load_artifact, save_artifact
+from highlight import build_overlay, overlay_count, render_highlighted
+from chunking import chunk_text_with_offsets
+import onnx_backend
+import inference_client
 import gen_ai1
 
 # ==================== CONFIGURATION ====================
 MAX_CHUNK_TOKENS = 256
 CHUNK_TOKEN_OVERLAP = 40
 CLASSIFICATION_MODEL_NAME = "Shrut04/Fine_tunned_indic_bert_on_documents"  # Updated model path
+CLASSIFY_MAX_LENGTH = 256
+# Chunks per forward pass; chunks are length-sorted first so padding stays small.
+CLASSIFY_BATCH_SIZE = int(os.getenv("CLASSIFY_BATCH_SIZE", "16"))
+# Department voting: chunks are classified in rounds of this many batches and voting
+# stops as soon as the leader can no longer be overtaken.
+VOTE_ROUND_BATCHES = int(os.getenv("VOTE_ROUND_BATCHES", "4"))
+# Optional early stop once the leader holds this share of the votes (>= 1.0 = disabled).
+VOTE_CONFIDENCE = float(os.getenv("VOTE_CONFIDENCE", "1.0"))
+VOTE_MIN_CHUNKS = int(os.getenv("VOTE_MIN_CHUNKS", "16"))
+# Optional stratified page sampling for very large documents (0 = disabled).
+VOTE_SAMPLE_MIN_PAGES = int(os.getenv("VOTE_SAMPLE_MIN_PAGES", "0"))
+VOTE_SAMPLE_PAGES = int(os.getenv("VOTE_SAMPLE_PAGES", "40"))
+# Threads for network-bound steps (storage uploads, LLM calls) that overlap with CPU work.
+IO_WORKERS = int(os.getenv("IO_WORKERS", "4"))
+
+# Bump when NER/cleaning logic changes so stored per-page NER results are recomputed.
+NER_ARTIFACT_VERSION = os.getenv("NER_ARTIFACT_VERSION", "4")
+# 1 = English pages go through spaCy's nlp.pipe together; 0 = the old one-call-per-page path.
+NER_BATCH = os.getenv("NER_BATCH", "1") == "1"
+
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="pipeline-io")
 
 #CURRENT_DIR = Path(__file__).resolve().parent
 #LOCAL_CLF_DIR = CURRENT_DIR / "models" / "final"
@@ -32,7 +58,6 @@ classification_dept_map = {
 }
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
-NLP_MODEL = spacy.load("en_core_web_md")
 
 
 def clean_text_multilingual(text):
@@ -43,50 +68,8 @@ def clean_text_multilingual(text):
     return text.strip()
 
 
-def extract_page_text(page, doc):
-    raw_text = ""
-    for block in page.get_text("blocks"):
-        txt = block[4].strip()
-        if txt:
-            raw_text += " " + txt
-
-    images = page.get_images(full=True)
-    for img in images:
-        xref = img[0]
-        try:
-            img_data = doc.extract_image(xref)
-            image = Image.open(io.BytesIO(img_data["image"]))
-        except Exception:
-            print(f"[WARNING] Image extraction failed")
-            continue
-
-        filtered = image.filter(ImageFilter.MedianFilter(size=3))
-        gray = ImageOps.grayscale(filtered)
-        scale = 300 / 72
-        base_w = min(int(gray.width * scale), 1000)
-        base_h = min(int(gray.height * scale), 1000)
-        gray_resized = gray.resize((base_w, base_h), Image.LANCZOS)
-
-        try:
-            ocr_text = pytesseract.image_to_string(gray_resized, lang="eng+mal")
-            raw_text += " " + ocr_text
-        except Exception:
-            continue
-
-    return raw_text.strip()
-
-
 def chunk_text_tokenwise(text, tokenizer, max_tokens=MAX_CHUNK_TOKENS, overlap=CHUNK_TOKEN_OVERLAP):
-    token_ids = tokenizer.encode(text, add_special_tokens=False)
-    chunks = []
-    start = 0
-    while start < len(token_ids):
-        end = min(start + max_tokens, len(token_ids))
-        chunk_ids = token_ids[start:end]
-        chunk_text = tokenizer.decode(chunk_ids, skip_special_tokens=True, clean_up_tokenization_spaces=True)
-        chunks.append(chunk_text)
-        start += max_tokens - overlap
-    return chunks
+    return [chunk["text"] for chunk in chunk_text_with_offsets(text, tokenizer, max_tokens, overlap)]
 
 
 def load_classification_model():
@@ -103,125 +86,383 @@ def load_classification_model():
     #     model.save_pretrained(LOCAL_CLF_DIR)
     print(f"[INFO] Loading classification model from hugging face: {CLASSIFICATION_MODEL_NAME}")
     tokenizer = AutoTokenizer.from_pretrained(CLASSIFICATION_MODEL_NAME)
+
+    if onnx_backend.onnx_enabled():
+        model = onnx_backend.load_onnx_model(
+            CLASSIFICATION_MODEL_NAME, "sequence-classification", tokenizer,
+            lambda: AutoModelForSequenceClassification.from_pretrained(CLASSIFICATION_MODEL_NAME),
+        )
+        if model is not None:
+            return tokenizer, model
+
     model = AutoModelForSequenceClassification.from_pretrained(CLASSIFICATION_MODEL_NAME).to(device)
     
     return tokenizer, model
 
 
-def classify_text_chunk(chunk, tokenizer, model):
-    inputs = tokenizer(chunk, padding=True, truncation=True, max_length=256, return_tensors="pt").to(device)
-    with torch.no_grad():
-        outputs = model(**inputs)
-    pred = outputs.logits.argmax(dim=-1).cpu().item()
-    return classification_dept_map.get(pred, "Unknown")
+def classify_chunk_ids(chunk_input_ids, tokenizer, model, batch_size=CLASSIFY_BATCH_SIZE):
+    """
+    Classifies already-tokenized chunks (lists of input_ids incl. special tokens) in batches.
+    Chunks are sorted into length buckets and each batch is padded only to its longest
+    member. Returns (labels, logits) in the original chunk order.
+    """
+    if not chunk_input_ids:
+        return [], torch.empty(0)
 
-_loaded_models = {}
+    if inference_client.enabled():
+        # The inference server batches these together with other workers' requests.
+        logits = torch.tensor(inference_client.classify([ids[:CLASSIFY_MAX_LENGTH] for ids in chunk_input_ids]))
+        labels = [classification_dept_map.get(pred, "Unknown") for pred in logits.argmax(dim=-1).tolist()]
+        return labels, logits
 
-def load_all_models():
-    global _loaded_models
-    if _loaded_models:
-        return _loaded_models['tokenizer'], _loaded_models['model'], _loaded_models['nlp_model']
+    order = sorted(range(len(chunk_input_ids)), key=lambda i: len(chunk_input_ids[i]))
+
+    model.eval()
+    logits = [None] * len(chunk_input_ids)
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            features = [{"input_ids": chunk_input_ids[i][:CLASSIFY_MAX_LENGTH]} for i in bucket]
+            batch = tokenizer.pad(features, padding="longest", return_tensors="pt").to(device)
+            batch_logits = model(**batch).logits.float().cpu()
+            for row, idx in enumerate(bucket):
+                logits[idx] = batch_logits[row]
+
+    logits = torch.stack(logits)
+    labels = [classification_dept_map.get(pred, "Unknown") for pred in logits.argmax(dim=-1).tolist()]
+    return labels, logits
+
+
+def classify_text_chunks(chunks, tokenizer, model, batch_size=CLASSIFY_BATCH_SIZE):
+    """Batched classification of raw chunk strings; see classify_chunk_ids."""
+    if not chunks:
+        return [], torch.empty(0)
+    input_ids = tokenizer(list(chunks), truncation=True, max_length=CLASSIFY_MAX_LENGTH)["input_ids"]
+    return classify_chunk_ids(input_ids, tokenizer, model, batch_size)
 
-    clf_tokenizer, clf_model = load_classification_model()
-    nlp_model = NLP_MODEL
 
-    _loaded_models = {
-        'tokenizer': clf_tokenizer,
-        'model': clf_model,
-        'nlp_model': nlp_model
+def classify_text_chunk(chunk, tokenizer, model):
+    labels, _ = classify_text_chunks([chunk], tokenizer, model)
+    return labels[0]
+
+def sample_pages_stratified(page_numbers, sample_size):
+    """Splits the pages into `sample_size` equal strata and takes the middle page of each."""
+    page_numbers = sorted(page_numbers)
+    if sample_size <= 0 or len(page_numbers) <= sample_size:
+        return page_numbers
+    stratum = len(page_numbers) / sample_size
+    return [page_numbers[int(i * stratum + stratum / 2)] for i in range(sample_size)]
+
+
+def vote_department(chunks, tokenizer, model, batch_size=CLASSIFY_BATCH_SIZE, confidence=VOTE_CONFIDENCE,
+                    min_chunks=VOTE_MIN_CHUNKS, sample_min_pages=VOTE_SAMPLE_MIN_PAGES,
+                    sample_pages=VOTE_SAMPLE_PAGES):
+    """
+    Majority vote over chunk classifications that stops early.
+
+    Chunks (dicts with "input_ids" and "page") are classified in document order, a few
+    batches at a time. Voting stops when the leading department is ahead by more votes
+    than there are chunks left (the result can no longer change), or when it holds at
+    least `confidence` (< 1.0) of the votes after `min_chunks`. Documents with at least
+    `sample_min_pages` pages are first reduced to a stratified sample of `sample_pages`.
+    """
+    pages = sorted({chunk["page"] for chunk in chunks})
+    sampled = None
+    if sample_min_pages and len(pages) >= sample_min_pages:
+        sampled = sample_pages_stratified(pages, sample_pages)
+        keep = set(sampled)
+        chunks = [chunk for chunk in chunks if chunk["page"] in keep]
+
+    votes = Counter()
+    classified = 0
+    stop_reason = "all chunks classified"
+    round_size = batch_size * max(VOTE_ROUND_BATCHES, 1)
+
+    for start in range(0, len(chunks), round_size):
+        batch = chunks[start:start + round_size]
+        labels, _ = classify_chunk_ids([chunk["input_ids"] for chunk in batch], tokenizer, model, batch_size)
+        votes.update(labels)
+        classified += len(batch)
+
+        ranked = votes.most_common(2)
+        lead = ranked[0][1] - (ranked[1][1] if len(ranked) > 1 else 0)
+        remaining = len(chunks) - classified
+        if remaining and lead > remaining:
+            stop_reason = "leader can no longer be overtaken"
+            break
+        if (remaining and confidence < 1.0 and classified >= min_chunks
+                and ranked[0][1] / classified >= confidence):
+            stop_reason = f"leader reached {confidence:.0%} of votes"
+            break
+
+    ranked = votes.most_common(2)
+    return {
+        "department": ranked[0][0] if ranked else "Unknown",
+        "chunks_classified": classified,
+        "chunks_total": len(chunks),
+        "margin": ranked[0][1] - (ranked[1][1] if len(ranked) > 1 else 0) if ranked else 0,
+        "stop_reason": stop_reason,
+        "sampled_pages": sampled,
     }
-    return clf_tokenizer, clf_model, nlp_model
-
-def highlight_text(pdf_path, terms, output_path="highlighted.pdf"):
-    doc = pymupdf.open(pdf_path)
-
-    for page_num, page in enumerate(doc):
-        # ----- 1. Native text search highlighting -----
-        for term in terms:
-            text_instances = page.search_for(term)
-            for inst in text_instances:
-                highlight = page.add_highlight_annot(inst)
-                highlight.update()
-
-        # ----- 2. OCR highlighting for scanned PDFs -----
-        # Render page as image
-        pix = page.get_pixmap()
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-
-        # OCR with bounding boxes
-        ocr_data = pytesseract.image_to_data(img, output_type=Output.DICT)
-        for i, word in enumerate(ocr_data['text']):
-            for term in terms:
-                if term.lower() in word.lower():
-                    x, y, w, h = (ocr_data['left'][i], ocr_data['top'][i],
-                                  ocr_data['width'][i], ocr_data['height'][i])
-                    # Convert OCR coords to PDF coordinates
-                    rect = pymupdf.Rect(x, y, x + w, y + h)
-                    highlight = page.add_highlight_annot(rect)
-                    highlight.update()
-
-    # Save PDF once after all highlights
-    doc.save(output_path)
-    doc.close()
-    return output_path
-
-def pipeline_process_pdf(pdf_path, clf_tokenizer, clf_model, nlp_model):
-    pdf_id = os.path.splitext(os.path.basename(pdf_path))[0]
-    doc = pymupdf.open(pdf_path)
-
-    dept_votes = []
+
+register_model("classifier", load_classification_model)
+
+
+register_model("classifier_tokenizer", lambda: AutoTokenizer.from_pretrained(CLASSIFICATION_MODEL_NAME))
+
+
+def load_all_models():
+    """
+    Loads (once) and returns the classifier tokenizer, classifier model and spaCy model.
+    With INFERENCE_URL set only the tokenizer (for chunking) is loaded here; the model
+    slots are None and inference goes to the inference server.
+    """
+    if inference_client.enabled():
+        return get_model("classifier_tokenizer"), None, None
+    clf_tokenizer, clf_model = get_model("classifier")
+    return clf_tokenizer, clf_model, get_nlp_en()
+
+class StageTimer:
+    """
+    Times named stages and reports them to an optional progress(stage, status, seconds)
+    callback, e.g. the ingestion job's progress record.
+    """
+
+    def __init__(self, progress=None):
+        self.progress = progress
+        self.timings = {}
+
+    def _report(self, stage, status, seconds=None):
+        if self.progress is not None:
+            try:
+                self.progress(stage, status, seconds)
+            except Exception as e:
+                print(f"[WARNING] Could not report progress for stage '{stage}': {e}")
+
+    @contextmanager
+    def stage(self, name):
+        self._report(name, "running")
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self._report(name, "failed", time.perf_counter() - start)
+            raise
+        self.timings[name] = round(time.perf_counter() - start, 3)
+        self._report(name, "completed", self.timings[name])
+
+    def start_background(self, name, fn, *args, **kwargs):
+        """
+        Runs fn on the I/O thread pool as stage `name`. Progress is only ever reported
+        from the calling thread, so the callback may use a non-thread-safe DB session.
+        """
+        self._report(name, "running")
+
+        def timed():
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs), time.perf_counter() - start, None
+            except Exception as e:
+                return None, time.perf_counter() - start, e
+
+        return io_executor.submit(timed)
+
+    def finish_background(self, name, future):
+        """Waits for a start_background stage, records it and returns its result (or raises its error)."""
+        result, seconds, error = future.result()
+        self.timings[name] = round(seconds, 3)
+        self._report(name, "failed" if error else "completed", self.timings[name])
+        if error is not None:
+            raise error
+        return result
+
+    def totals(self, wall_seconds):
+        """Critical-path (wall-clock) time versus the plain sum of all stage times."""
+        return {
+            "critical_path_seconds": round(wall_seconds, 3),
+            "stage_seconds_sum": round(sum(self.timings.values()), 3),
+        }
+
+
+def pipeline_process_pdf(pdf_path, clf_tokenizer, clf_model, nlp_model, workers=None, max_memory_mb=None,
+                         output_dir=None, progress=None, pdf_id=None, render_pdf=True):
+    """
+    `pdf_path` may also be the PDF bytes (then `pdf_id` is required). Highlights always
+    come back as results["highlight_overlay"] (see highlight.build_overlay). With
+    render_pdf the highlighted PDF is also written: with bytes and no output_dir
+    nothing touches the disk and it comes back in results["highlighted_pdf_bytes"]
+    instead of a path in results["highlighted_pdf"].
+    """
+    in_memory = isinstance(pdf_path, (bytes, bytearray, memoryview))
+    if pdf_id is None:
+        if in_memory:
+            raise ValueError("pdf_id is required when the PDF is passed as bytes")
+        pdf_id = os.path.splitext(os.path.basename(pdf_path))[0]
+    timer = StageTimer(progress)
+    wall_start = time.perf_counter()
+
     deadlines_all = []
     financials_all = []
 
-    for page_number, page in enumerate(doc, start=1):
-        raw_text = extract_page_text(page, doc)
-
+    # Per-page artifacts are keyed by page content hash, so only new/changed pages
+    # (or stages whose version changed) are recomputed.
+    artifact_counts = Counter()
+    extract_version = extraction_version()
+    ner_version = (f"{extract_version}|{NER_ARTIFACT_VERSION}|en_core_web_md|ai4bharat/IndicNER|{SPACY_SENTENCES}|"
+                   f"{onnx_backend.INFERENCE_BACKEND}")
+    chunk_version = (f"{extract_version}|{CLASSIFICATION_MODEL_NAME}|{MAX_CHUNK_TOKENS}|"
+                     f"{CHUNK_TOKEN_OVERLAP}|{CLASSIFY_MAX_LENGTH}")
+
+    # Text extraction / OCR is spread over a process pool; pages come back in order.
+    # Hashing, extraction workers and highlighting each open (and close) the PDF
+    # themselves, so no document stays open across the stages.
+    with timer.stage("extraction"):
+        if PAGE_ARTIFACTS_ENABLED:
+            hashes = page_hashes(pdf_path)
+            extracted = {}
+            for page_number, page_hash in enumerate(hashes, start=1):
+                stored = load_artifact("extract", extract_version, page_hash)
+                if stored is not None:
+                    extracted[page_number] = stored
+            artifact_counts["extract_reused"] = len(extracted)
+            missing = [n for n in range(1, len(hashes) + 1) if n not in extracted]
+            for page_number, page_result in extract_pages(pdf_path, workers=workers, max_memory_mb=max_memory_mb,
+                                                          page_numbers=missing):
+                extracted[page_number] = page_result
+                save_artifact("extract", extract_version, hashes[page_number - 1], page_result)
+        else:
+            # Artifacts are neither loaded nor saved, so the pages are not hashed.
+            extracted = dict(extract_pages(pdf_path, workers=workers, max_memory_mb=max_memory_mb))
+            hashes = [None] * len(extracted)
+        pages = [(n, extracted[n]) for n in range(1, len(hashes) + 1)]
+
+    ocr_decisions = []
+    for page_number, page_result in pages:
+        ocr_decisions.extend({"page": page_number, **d} for d in page_result["ocr"])
+    ocr_actions = Counter(d["action"] for d in ocr_decisions)
+    print(f"[INFO] OCR gating: {dict(ocr_actions)} over {len(ocr_decisions)} image(s)")
+
+    cleaned_pages = []
+    for page_number, page_result in pages:
+        raw_text = page_result["text"]
         if not raw_text:
             continue
         # print("cleaned_text\n")
         cleaned_text = clean_text_multilingual(raw_text)
         # print(cleaned_text)
-        if not cleaned_text:
-            continue
-
-        ner_results = ner_extraction_multilingual(cleaned_text)
-        deadlines_all.extend(ner_results.get("deadlines", []))
-        financials_all.extend(ner_results.get("financials", []))
-
-        chunks = chunk_text_tokenwise(cleaned_text, tokenizer=clf_tokenizer)
-        gen_ai1.encode(pdf_id, page_number,chunks)
+        if cleaned_text:
+            cleaned_pages.append((page_number, hashes[page_number - 1], cleaned_text))
+
+    # All pages needing NER go through spaCy in one batched pass (NER_BATCH=0: per page).
+    with timer.stage("ner"):
+        ner_by_page = {}
+        for page_number, page_hash, _ in cleaned_pages:
+            stored = load_artifact("ner", ner_version, page_hash)
+            if stored is not None:
+                ner_by_page[page_number] = stored
+        artifact_counts["ner_reused"] = len(ner_by_page)
+        todo = [(n, h, text) for n, h, text in cleaned_pages if n not in ner_by_page]
+        if NER_BATCH:
+            computed = ner_extraction_multilingual_batch([text for _, _, text in todo])
+        else:
+            computed = [ner_extraction_multilingual(text) for _, _, text in todo]
+        for (page_number, page_hash, _), ner_results in zip(todo, computed):
+            ner_by_page[page_number] = {
+                "deadlines": ner_results.get("deadlines", []),
+                "financials": ner_results.get("financials", []),
+            }
+            save_artifact("ner", ner_version, page_hash, ner_by_page[page_number])
+        for page_number, _, _ in cleaned_pages:
+            deadlines_all.extend(ner_by_page[page_number]["deadlines"])
+            financials_all.extend(ner_by_page[page_number]["financials"])
+
+    doc_chunks = []
+    page_chunks = []
+    with timer.stage("chunking"):
+        for page_number, page_hash, cleaned_text in cleaned_pages:
+            # Tokenized once: span text goes to the embedder, input_ids straight to the classifier.
+            chunks = load_artifact("chunks", chunk_version, page_hash)
+            if chunks is None:
+                chunks = chunk_text_with_offsets(cleaned_text, clf_tokenizer, MAX_CHUNK_TOKENS, CHUNK_TOKEN_OVERLAP,
+                                                 max_length=CLASSIFY_MAX_LENGTH)
+                save_artifact("chunks", chunk_version, page_hash, chunks)
+            else:
+                artifact_counts["chunks_reused"] += 1
+            page_chunks.append((page_number, [chunk["text"] for chunk in chunks]))
+            doc_chunks.extend({**chunk, "page": page_number} for chunk in chunks)
+    artifact_counts["pages"] = len(pages)
+    print(f"[INFO] Page artifacts reused: {dict(artifact_counts)}")
+
+    # One embedding batch for the whole document. The upserts and the LLM summary (built
+    # from the in-memory vectors) are network-bound and overlap with classification
+    # and highlighting.
+    with timer.stage("embedding"):
+        pending_upserts, vectors = gen_ai1.encode_document(pdf_id, page_chunks, wait=False)
+    summary_future = timer.start_background(
+        "summary", gen_ai1.create_summary, pdf_id, docs=gen_ai1.top_k_from_vectors(vectors) or None
+    )
+
+    with timer.stage("classification"):
+        vote = vote_department(doc_chunks, clf_tokenizer, clf_model)
+    dominant_dept = vote["department"]
+    print(f"[INFO] Department vote: {dominant_dept} (margin {vote['margin']}, "
+          f"{vote['chunks_classified']}/{vote['chunks_total']} chunks, {vote['stop_reason']})")
 
-        # print("chunks\n")
-        for chunk in chunks:
-            # print(chunk)
-            dept = classify_text_chunk(chunk, clf_tokenizer, clf_model)
-            dept_votes.append(dept)
-
-    dominant_dept = Counter(dept_votes).most_common(1)[0][0] if dept_votes else "Unknown"
-
-    summary = gen_ai1.create_summary(pdf_id)
-    #print(summary)
     terms = deadlines_all + financials_all
-    output_path = highlight_text(pdf_path, terms=terms, output_path=f"{pdf_id}_highlighted.pdf")
+    # Scanned content is highlighted from the word boxes OCR'd during extraction.
+    ocr_words = {n: page_result.get("ocr_words", []) for n, page_result in pages}
+    output_path = None
+    highlighted_bytes = None
+    with timer.stage("highlight"):
+        doc = open_pdf(pdf_path)
+        try:
+            overlay = build_overlay(doc, terms, ocr_words)
+        finally:
+            doc.close()
+        print(f"[INFO] Highlight overlay: {overlay_count(overlay)} occurrence(s) on {len(overlay['pages'])} page(s)")
+        if render_pdf:
+            if in_memory and output_dir is None:
+                highlighted_bytes = render_highlighted(pdf_path, overlay)
+            else:
+                output_path = render_highlighted(pdf_path, overlay,
+                                                 os.path.join(output_dir or "", f"{pdf_id}_highlighted.pdf"))
+
+    with timer.stage("vector_upsert"):
+        gen_ai1.wait_for_upserts(pending_upserts, pdf_id)
+    # create_summary handles its own errors and returns a message instead of raising.
+    summary = timer.finish_background("summary", summary_future)
+    #print(summary)
+    totals = timer.totals(time.perf_counter() - wall_start)
+    print(f"[INFO] Pipeline for {pdf_id}: {totals['critical_path_seconds']}s critical path "
+          f"({totals['stage_seconds_sum']}s of stage work)")
     return {
         "department": dominant_dept,
         "summary": summary,
         "deadlines": deadlines_all,
         "financials": financials_all,
-        "highlighted_pdf": output_path
+        "highlighted_pdf": output_path,
+        "highlighted_pdf_bytes": highlighted_bytes,
+        "highlight_overlay": overlay,
+        "ocr_decisions": ocr_decisions,
+        "vote": vote,
+        "timings": {**timer.timings, **totals},
+        "page_artifacts": dict(artifact_counts),
     }
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Unified PDF Processing Pipeline")
     parser.add_argument("pdf_file", help="Path to input PDF file")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction worker processes (1 = serial)")
+    parser.add_argument("--max-memory-mb", type=int, default=None, help="Memory budget for the extraction pool")
     args = parser.parse_args()
 
     print("[INFO] Loading all models...")
     tokenizer, model, nlp_model = load_all_models()
 
     print("[INFO] Processing PDF through pipeline...")
-    results = pipeline_process_pdf(args.pdf_file, tokenizer, model, nlp_model)
+    results = pipeline_process_pdf(args.pdf_file, tokenizer, model, nlp_model,
+                                   workers=args.workers, max_memory_mb=args.max_memory_mb)
 
     print("\n================ Pipeline Output ================\n")
     #print(f"Dominant Department: {results['department']}")
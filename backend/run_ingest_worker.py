@@ -0,0 +1,46 @@
+# backend/run_ingest_worker.py
+# Runs ingestion workers that process queued uploads (see ingestion.py).
+# Scale by starting more processes here, or more containers, independently of the API.
+import argparse
+import multiprocessing
+import os
+
+import gen_ai1
+import inference_client
+from ingestion import worker_loop, make_worker_id
+from model_registry import registry, memory_report
+from pipeline import load_all_models
+
+INGEST_WORKER_PROCESSES = int(os.getenv("INGEST_WORKER_PROCESSES", "1"))
+# Load the models once in this parent process and fork the workers from it, so they
+# share the model memory copy-on-write (same idea as gunicorn.conf.py).
+INGEST_PRELOAD = os.getenv("INGEST_PRELOAD", "1") == "1"
+
+
+def _run(index):
+    worker_loop(worker_id=f"{make_worker_id()}-{index}")
+
+
+# --- MAIN LOOP ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Document ingestion worker")
+    parser.add_argument("--processes", type=int, default=INGEST_WORKER_PROCESSES,
+                        help="Number of worker processes to run")
+    args = parser.parse_args()
+
+    print(f"✅ Starting {args.processes} ingestion worker process(es)...")
+    if args.processes <= 1:
+        _run(0)
+    else:
+        if INGEST_PRELOAD and not inference_client.enabled():
+            load_all_models()
+            registry.warmup(["indic_ner", "embedder"], then=gen_ai1.warm_summary_query, background=False)
+            registry.prepare_for_fork()
+            print(f"[INFO] Models preloaded in parent: {memory_report()}")
+        # Forked (not spawned) so the children inherit the preloaded models.
+        ctx = multiprocessing.get_context("fork" if os.name == "posix" else "spawn")
+        processes = [ctx.Process(target=_run, args=(i,)) for i in range(args.processes)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
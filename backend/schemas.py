@@ -2,7 +2,7 @@
 from pydantic import BaseModel
 import uuid
 import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 # --- User Schemas (Unchanged) ---
 class UserBase(BaseModel):
@@ -68,6 +68,22 @@ class Notification(BaseModel):
     class Config:
         from_attributes = True
 
+class IngestionJob(BaseModel):
+    id: uuid.UUID
+    document_id: uuid.UUID
+    filename: str
+    status: str
+    stage: Optional[str] = None
+    progress: Optional[Dict[str, Any]] = {}
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime.datetime
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class UserLogin(BaseModel):
     id: str
     password: str
\ No newline at end of file
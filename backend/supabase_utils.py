@@ -15,10 +15,10 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
 def upload_file_to_supabase(file, filename: str):
     """
-    Uploads a file to Supabase Storage and returns its public URL.
+    Uploads a file (file object or bytes) to Supabase Storage and returns its public URL.
     """
     try:
-        file_content = file.read()
+        file_content = bytes(file) if isinstance(file, (bytes, bytearray, memoryview)) else file.read()
         mime_type, _ = mimetypes.guess_type(filename)
         if mime_type is None:
             mime_type = 'application/octet-stream'
@@ -39,3 +39,28 @@ def upload_file_to_supabase(file, filename: str):
     except Exception as e:
         print(f"Error uploading to Supabase: {e}")
         return None
+
+def download_file_from_supabase(filename: str):
+    """Returns the bytes of a stored file, or None if it could not be fetched."""
+    try:
+        return supabase.storage.from_(BUCKET_NAME).download(filename)
+    except Exception as e:
+        print(f"Error downloading from Supabase: {e}")
+        return None
+
+def get_public_url(filename: str):
+    """Public URL a file will have once uploaded; computed locally, no network call."""
+    return supabase.storage.from_(BUCKET_NAME).get_public_url(filename)
+
+
+def copy_file_in_supabase(source_filename: str, filename: str):
+    """
+    Copies an already stored file to a new name on the storage server (no re-upload)
+    and returns the new public URL.
+    """
+    try:
+        supabase.storage.from_(BUCKET_NAME).copy(source_filename, filename)
+        return supabase.storage.from_(BUCKET_NAME).get_public_url(filename)
+    except Exception as e:
+        print(f"Error copying in Supabase: {e}")
+        return None
@@ -0,0 +1,87 @@
+# backend/tests/test_deadline_extractor.py
+# Parity of the batched English extraction (DeadlineExtractor) with the original
+# per-date implementation it replaced.
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+spacy = pytest.importorskip("spacy")
+pytest.importorskip("transformers")
+from spacy.matcher import PhraseMatcher  # noqa: E402
+
+import ner_functions  # noqa: E402
+
+_DATETIME_RE = re.compile(r"\d{2}-\d{2}-\d{4} \d{2}:\d{2}:\d{2}")
+_DATE_RE = re.compile(r"\d{2}-\d{2}-\d{4}")
+_MONEY_RE = re.compile(r"(?:Rs\.?|₹)\s?\d{1,3}(?:,\d{3})*(?:\.\d+)?")
+
+EN_REGRESSION_CORPUS = [
+    "The payment of Rs. 500 is due by 15-10-2025 10:30:00. Submission deadline is 20-10-2025.",
+    "Bid End Date/Time 20-10-2025 15:00:00. Bid Opening Date/Time 20-10-2025 15:30:00. "
+    "EMD Amount ₹ 50,000 to be paid on or before 18-10-2025.",
+    "Last date of receipt of tenders: 5 November 2025. Tender fee Rs.1,180 (non-refundable). "
+    "Pre-bid meeting on 28 October 2025 at Muttom depot.",
+    "The contract is valid till 31-03-2027. Performance security of 5% of the contract value, "
+    "i.e. Rs. 2,50,000, shall be furnished within 14 days. No application will be entertained after 10-11-2025.",
+    "Escalator maintenance at Aluva station was completed on 12-09-2025. Invoice amount ₹12,400.50 was paid.",
+]
+
+
+def ner_extraction_en_reference(text, nlp):
+    """The original per-date implementation, kept here as the reference."""
+    docs = nlp(text)
+    spacy_dates = [ent.text for ent in docs.ents if ent.label_ == 'DATE']
+    spacy_money = [ent.text for ent in docs.ents if ent.label_ == 'MONEY']
+    all_dates = set(spacy_dates + _DATETIME_RE.findall(text) + _DATE_RE.findall(text))
+    all_money = set(spacy_money + _MONEY_RE.findall(text))
+
+    matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+    matcher.add("DEADLINE_KEYWORD", [nlp(keyword) for keyword in ner_functions.DEADLINE_KEYWORDS])
+    deadlines = []
+    for date_str in all_dates:
+        start_pos = text.find(date_str)
+        if start_pos == -1:
+            continue
+        span = docs.char_span(start_pos, start_pos + len(date_str))
+        if span is None:
+            continue
+        for match_id, start, end in matcher(docs):
+            if abs(start - span.start) <= ner_functions.DEADLINE_KEYWORD_WINDOW:
+                deadlines.append(span.sent.text)
+
+    money = []
+    for ent in all_money:
+        start_pos = text.find(ent)
+        if start_pos == -1:
+            continue
+        span = docs.char_span(start_pos, start_pos + len(ent))
+        money.append(span.sent.text if span is not None else ent)
+    return {"deadlines": list(set(deadlines)), "financials": list(set(money))}
+
+
+@pytest.fixture(scope="module")
+def nlp():
+    try:
+        return spacy.load("en_core_web_md")
+    except OSError:
+        pytest.skip("en_core_web_md is not installed")
+
+
+@pytest.mark.parametrize("text", EN_REGRESSION_CORPUS)
+def test_matches_reference(nlp, text):
+    expected = ner_extraction_en_reference(text, nlp)
+    actual = ner_functions.ner_extraction_en(text, nlp)
+    assert set(actual["deadlines"]) == set(expected["deadlines"])
+    assert set(actual["financials"]) == set(expected["financials"])
+
+
+def test_batch_matches_single(nlp):
+    batched = ner_functions.ner_extraction_en_batch(EN_REGRESSION_CORPUS, nlp, n_process=1)
+    for text, actual in zip(EN_REGRESSION_CORPUS, batched):
+        expected = ner_functions.ner_extraction_en(text, nlp)
+        assert set(actual["deadlines"]) == set(expected["deadlines"])
+        assert set(actual["financials"]) == set(expected["financials"])
@@ -0,0 +1,273 @@
+# backend/vector_store.py
+# Vector storage behind one small interface.
+#
+#   VECTOR_STORE=pinecone  -- remote Pinecone serverless index (default, previous behaviour)
+#   VECTOR_STORE=local     -- embedded store: one memory-mapped float32 matrix per namespace,
+#                             rows grouped into contiguous per-document slices
+#
+# Vectors are (id, values, metadata) tuples, as Pinecone takes them. Queries return
+# {"matches": [{"id", "score", "metadata"}, ...]} for every backend.
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+VECTOR_STORE = os.getenv("VECTOR_STORE", "pinecone").lower()
+VECTOR_DIMENSION = 384
+PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "quickstart")
+LOCAL_VECTOR_DIR = os.getenv("LOCAL_VECTOR_DIR", "vector_store")
+
+
+class VectorStore:
+    """Interface shared by all vector store backends."""
+
+    def upsert(self, vectors, namespace):
+        raise NotImplementedError
+
+    def query(self, vector, top_k=10, namespace="", include_metadata=True):
+        raise NotImplementedError
+
+    def delete_document(self, pdf_id, namespace=None):
+        """Removes every vector whose metadata pdf_id matches (namespace defaults to pdf_id)."""
+        raise NotImplementedError
+
+    def delete_namespace(self, namespace):
+        raise NotImplementedError
+
+
+class PineconeVectorStore(VectorStore):
+    def __init__(self, api_key=None, index_name=PINECONE_INDEX_NAME, dimension=VECTOR_DIMENSION):
+        from pinecone import Pinecone, ServerlessSpec
+
+        api_key = api_key or os.getenv("PINECONE_API_KEY")
+        if not api_key:
+            raise ValueError("❌ PINECONE_API_KEY not found in environment variables")
+        pc = Pinecone(api_key=api_key)
+        if not pc.has_index(index_name):
+            pc.create_index(
+                name=index_name,
+                dimension=dimension,
+                metric="cosine",
+                spec=ServerlessSpec(cloud="aws", region="us-east-1")
+            )
+        self.index = pc.Index(index_name)
+
+    def upsert(self, vectors, namespace):
+        self.index.upsert(vectors, namespace=str(namespace))
+
+    def query(self, vector, top_k=10, namespace="", include_metadata=True):
+        results = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=include_metadata,
+            namespace=str(namespace)
+        )
+        return {
+            "matches": [
+                {"id": m["id"], "score": m.get("score"), "metadata": m.get("metadata") or {}}
+                for m in results.get("matches", [])
+            ]
+        }
+
+    def delete_document(self, pdf_id, namespace=None):
+        namespace = str(namespace or pdf_id)
+        # Serverless indexes cannot delete by metadata filter; ids are "<pdf_id>_<page>_<i>".
+        for ids in self.index.list(prefix=f"{pdf_id}_", namespace=namespace):
+            self.index.delete(ids=ids, namespace=namespace)
+
+    def delete_namespace(self, namespace):
+        self.index.delete(delete_all=True, namespace=str(namespace))
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Embedded store for single-node / offline use.
+
+    Each namespace is a directory of generations: `vectors.<n>.npy` (L2-normalised float32
+    rows, opened memory-mapped for queries) and `records.<n>.json` (ids, metadata and the
+    row slice of each document), with the file `CURRENT` naming the live generation.
+    Writers build a new generation and switch `CURRENT` under an exclusive file lock;
+    readers open a generation under a shared lock, so vectors and records always match
+    and several processes can share the directory.
+    """
+
+    def __init__(self, root=LOCAL_VECTOR_DIR, dimension=VECTOR_DIMENSION):
+        self.root = root
+        self.dimension = dimension
+        self._lock = threading.Lock()
+        self._mmaps = {}  # namespace -> (generation, matrix, records)
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, namespace):
+        safe = str(namespace).replace("/", "_").replace("\\", "_") or "_default"
+        return os.path.join(self.root, safe)
+
+    @contextmanager
+    def _file_lock(self, namespace, shared=False):
+        """
+        Lock on the namespace across processes: flock (shared or exclusive), or an
+        exclusive msvcrt lock on Windows.
+        """
+        path = self._dir(namespace)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, ".lock"), "a+") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                yield
+                return
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _generation(self, namespace):
+        """The live generation, "" for a store written before generations, None if empty."""
+        path = self._dir(namespace)
+        try:
+            with open(os.path.join(path, "CURRENT"), encoding="utf-8") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return "" if os.path.exists(os.path.join(path, "vectors.npy")) else None
+
+    def _paths(self, namespace, generation):
+        suffix = f".{generation}" if generation else ""
+        path = self._dir(namespace)
+        return os.path.join(path, f"vectors{suffix}.npy"), os.path.join(path, f"records{suffix}.json")
+
+    def _load(self, namespace, locked=False):
+        """
+        Returns (matrix, records) for a namespace; matrix is memory-mapped and cached.
+        Takes the shared file lock unless the caller already holds the exclusive one.
+        """
+        generation = self._generation(namespace)
+        if generation is None:
+            return np.zeros((0, self.dimension), dtype=np.float32), {"ids": [], "metadata": [], "slices": {}}
+        cached = self._mmaps.get(namespace)
+        if cached and cached[0] == generation:
+            return cached[1], cached[2]
+        if not locked:
+            with self._file_lock(namespace, shared=True):
+                return self._load(namespace, locked=True)
+        vectors_path, records_path = self._paths(namespace, generation)
+        matrix = np.load(vectors_path, mmap_mode="r")
+        with open(records_path, encoding="utf-8") as f:
+            records = json.load(f)
+        self._mmaps[namespace] = (generation, matrix, records)
+        return matrix, records
+
+    def _write(self, namespace, rows):
+        """
+        rows: list of (id, vector, metadata); stored grouped by document as a new
+        generation. The caller holds the exclusive file lock.
+        """
+        path = self._dir(namespace)
+        rows = sorted(rows, key=lambda r: str(r[2].get("pdf_id", "")))
+        matrix = np.asarray([r[1] for r in rows], dtype=np.float32).reshape(-1, self.dimension)
+        slices = {}
+        for i, (_, _, meta) in enumerate(rows):
+            doc = str(meta.get("pdf_id", ""))
+            start, _ = slices.get(doc, (i, i))
+            slices[doc] = (start, i + 1)
+        records = {"ids": [r[0] for r in rows], "metadata": [r[2] for r in rows], "slices": slices}
+
+        previous = self._generation(namespace)
+        generation = str(int(previous) + 1 if previous else 1)
+        vectors_path, records_path = self._paths(namespace, generation)
+        np.save(vectors_path, matrix)
+        with open(records_path, "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False)
+        tmp_current = os.path.join(path, "CURRENT.tmp")
+        with open(tmp_current, "w", encoding="utf-8") as f:
+            f.write(generation)
+        os.replace(tmp_current, os.path.join(path, "CURRENT"))
+        self._mmaps.pop(namespace, None)
+
+        # Older generations are unreferenced now; readers that mapped one keep their mapping.
+        for name in os.listdir(path):
+            if name.startswith(("vectors", "records")) and name not in (os.path.basename(vectors_path),
+                                                                        os.path.basename(records_path)):
+                try:
+                    os.remove(os.path.join(path, name))
+                except OSError:
+                    pass  # still mapped on Windows; removed by a later write
+
+    def _rows(self, namespace):
+        matrix, records = self._load(namespace, locked=True)
+        return [(i, np.array(v), m) for i, v, m in zip(records["ids"], matrix, records["metadata"])]
+
+    def upsert(self, vectors, namespace):
+        new_rows = []
+        for vec_id, values, meta in vectors:
+            values = np.asarray(values, dtype=np.float32)
+            norm = np.linalg.norm(values)
+            new_rows.append((str(vec_id), values / norm if norm else values, meta or {}))
+        with self._lock, self._file_lock(namespace):
+            new_ids = {r[0] for r in new_rows}
+            rows = [r for r in self._rows(namespace) if r[0] not in new_ids] + new_rows
+            self._write(namespace, rows)
+
+    def query(self, vector, top_k=10, namespace="", include_metadata=True, pdf_id=None):
+        with self._lock:
+            matrix, records = self._load(namespace)
+        if pdf_id is not None:
+            start, end = records["slices"].get(str(pdf_id), (0, 0))
+        else:
+            start, end = 0, len(records["ids"])
+        if end <= start:
+            return {"matches": []}
+
+        q = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        scores = matrix[start:end] @ (q / norm if norm else q)
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return {
+            "matches": [
+                {
+                    "id": records["ids"][start + i],
+                    "score": float(scores[i]),
+                    "metadata": records["metadata"][start + i] if include_metadata else {},
+                }
+                for i in top
+            ]
+        }
+
+    def delete_document(self, pdf_id, namespace=None):
+        namespace = namespace or pdf_id
+        with self._lock, self._file_lock(namespace):
+            rows = [r for r in self._rows(namespace) if str(r[2].get("pdf_id", "")) != str(pdf_id)]
+            self._write(namespace, rows)
+
+    def delete_namespace(self, namespace):
+        with self._lock, self._file_lock(namespace):
+            self._write(namespace, [])
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store():
+    """Returns the configured vector store, created on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if VECTOR_STORE == "local":
+                print(f"[INFO] Using local vector store at {LOCAL_VECTOR_DIR}")
+                _store = LocalVectorStore()
+            else:
+                _store = PineconeVectorStore()
+    return _store
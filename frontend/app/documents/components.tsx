@@ -150,7 +150,7 @@ export const DocumentViewerModal = ({ doc, onClose, onOpenQna }: { doc: Document
                     {activeTab === 'highlighted' && (
                         doc.highlighted_file_path ? (
                             <iframe
-                                src={doc.highlighted_file_path}
+                                src={doc.highlighted_file_path.startsWith('/') ? `${API_BASE}${doc.highlighted_file_path}` : doc.highlighted_file_path}
                                 className="w-full h-full bg-white rounded-md"
                                 title={`${doc.title} (Highlighted)`}
                             ></iframe>
@@ -5,6 +5,7 @@ from pathlib import Path
 import io
 import argparse
 import os
+import sys
 import pymupdf # fitz
 from PIL import Image, ImageOps, ImageFilter
 import pytesseract
@@ -12,8 +13,14 @@ import spacy
 import torch
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 
+# The chunker and OCR cache are the backend's own modules, not copies. backend/ goes at the end of
+# sys.path so this folder's ner_functions / gen_ai1 still win over the backend ones.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
 # Aapke local modules
 from ner_functions import ner_extraction, get_deadline, get_financial_details
+from ocr_cache import cached_ocr
+from chunking import chunk_text_with_offsets
 import gen_ai1
 
 # ==================== CONFIGURATION ====================
@@ -34,16 +41,7 @@ def clean_text(text):
 
 
 def chunk_text_tokenwise(text, tokenizer):
-    token_ids = tokenizer.encode(text, add_special_tokens=False)
-    chunks = []
-    start = 0
-    while start < len(token_ids):
-        end = min(start + MAX_CHUNK_TOKENS, len(token_ids))
-        chunk_ids = token_ids[start:end]
-        chunk_text = tokenizer.decode(chunk_ids, skip_special_tokens=True)
-        chunks.append(chunk_text)
-        start += MAX_CHUNK_TOKENS - CHUNK_TOKEN_OVERLAP
-    return chunks
+    return [chunk["text"] for chunk in chunk_text_with_offsets(text, tokenizer, MAX_CHUNK_TOKENS, CHUNK_TOKEN_OVERLAP)]
 
 
 def load_classification_model():
@@ -63,6 +61,14 @@ def classify_text_chunk(chunk, tokenizer, model):
     return model.config.id2label.get(pred_index, "Unknown")
 
 
+def classify_chunk_ids(input_ids, model):
+    # input_ids come ready-made from chunk_text_with_offsets; no re-tokenization.
+    with torch.no_grad():
+        outputs = model(input_ids=torch.tensor([input_ids], device=device))
+    pred_index = outputs.logits.argmax(dim=-1).cpu().item()
+    return model.config.id2label.get(pred_index, "Unknown")
+
+
 def load_all_models():
     clf_tokenizer, clf_model = load_classification_model()
     nlp_model = NLP_MODEL
@@ -73,11 +79,22 @@ def load_all_models():
 #//--- CHANGE START ---//
 # Yeh naya master function hai jo digital text, tables, aur scanned images, teeno ko handle karta hai.
 
+def _ocr_gray(image_bytes):
+    image = Image.open(io.BytesIO(image_bytes))
+    # Image pre-processing (aapke code se)
+    filtered = image.filter(ImageFilter.MedianFilter(size=3))
+    gray = ImageOps.grayscale(filtered)
+    return pytesseract.image_to_string(gray)
+
+
 def extract_text_from_hybrid_pdf(pdf_path):
     doc = pymupdf.open(pdf_path)
     full_text_content = ""
     print(f"[INFO] Starting hybrid extraction for PDF: {pdf_path.name}")
     
+    # Same image (logo, seal) on many pages -> OCR once per document, and once ever via the disk cache.
+    xref_ocr = {}
+
     for page_num, page in enumerate(doc, start=1):
         page_text = ""
         # 1. Digital Text nikaalo
@@ -101,12 +118,11 @@ def extract_text_from_hybrid_pdf(pdf_path):
             for img in images:
                 xref = img[0]
                 try:
-                    img_data = doc.extract_image(xref)
-                    image = Image.open(io.BytesIO(img_data["image"]))
-                    # Image pre-processing (aapke code se)
-                    filtered = image.filter(ImageFilter.MedianFilter(size=3))
-                    gray = ImageOps.grayscale(filtered)
-                    ocr_text = pytesseract.image_to_string(gray)
+                    if xref not in xref_ocr:
+                        image_bytes = doc.extract_image(xref)["image"]
+                        xref_ocr[xref] = cached_ocr(image_bytes, "median3-gray", "eng",
+                                                    lambda: _ocr_gray(image_bytes))
+                    ocr_text = xref_ocr[xref]
                     if ocr_text.strip():
                          page_text += f"\n--- OCR TEXT FROM IMAGE START ---\n{ocr_text.strip()}\n--- OCR TEXT FROM IMAGE END ---\n"
                 except Exception:
@@ -141,9 +157,9 @@ def process_extracted_text(full_text, file_id, clf_tokenizer, clf_model, nlp_mod
         return {"department": "Unknown", "summary": "No text found.", "deadlines": [], "financials": []}
     cleaned_text = clean_text(full_text)
     ner_results = ner_extraction(cleaned_text, nlp_model)
-    chunks = chunk_text_tokenwise(cleaned_text, clf_tokenizer)
-    gen_ai1.encode(file_id, 1, chunks)
-    dept_votes = [classify_text_chunk(chunk, clf_tokenizer, clf_model) for chunk in chunks]
+    chunks = chunk_text_with_offsets(cleaned_text, clf_tokenizer, MAX_CHUNK_TOKENS, CHUNK_TOKEN_OVERLAP, max_length=512)
+    gen_ai1.encode(file_id, 1, [chunk["text"] for chunk in chunks])
+    dept_votes = [classify_chunk_ids(chunk["input_ids"], clf_model) for chunk in chunks]
     dominant_dept = Counter(dept_votes).most_common(1)[0][0] if dept_votes else "Unknown"
     summary = gen_ai1.create_summary(file_id)
     return {